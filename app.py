@@ -6,7 +6,10 @@ import numpy as np
 from IPython.display import display
 import streamlit.components.v1 as components
 from game.board import Board
-from game.player import HumanPlayer, GreedyGreta, MinimaxMax, RLRandomRiley, EdgesEdgar
+from game.game_state import GameState
+from game.endgame import ENDGAME_EMPTIES
+from game.opening_book import load_book
+from game.player import HumanPlayer, GreedyGreta, MinimaxMax, RLRandomRiley, EdgesEdgar, MonteCarloMonty, PatternPete, SearchPlayer
 
 # Build credentials dict from Streamlit secrets
 firebase_config = {
@@ -34,13 +37,18 @@ db = firestore.client()
 
 
 
+OPENING_BOOK = load_book()  # memory-mapped, shared by all players
+
 PLAYER_FACTORIES = {
     "Human": lambda color: HumanPlayer(color),
     "Greedy Greta (simple AI)": lambda color: GreedyGreta(color),
     "Minimax Max (lookahead AI)": lambda color: MinimaxMax(color, depths=[
         st.session_state.get("black_depth", 2),
         st.session_state.get("red_depth", 2)
-    ]),
+    ], time_budget=st.session_state.get("ai_think_time") or None,
+       selective=st.session_state.get("selective_search", False),
+       endgame_empties=st.session_state.get("endgame_empties", ENDGAME_EMPTIES),
+       book=OPENING_BOOK if st.session_state.get("use_book", True) else None),
     "RL Random Riley (random RL)": lambda color: RLRandomRiley(color),
     "Edges Edgar (edge control AI)": lambda color: EdgesEdgar(
         color,
@@ -56,7 +64,20 @@ PLAYER_FACTORIES = {
             st.session_state.get("border_value_black", 1),
             st.session_state.get("border_value_red", 1)
         ],
+        time_budget=st.session_state.get("ai_think_time") or None,
+        selective=st.session_state.get("selective_search", False),
+        endgame_empties=st.session_state.get("endgame_empties", ENDGAME_EMPTIES),
+        book=OPENING_BOOK if st.session_state.get("use_book", True) else None,
     ),
+    "Pattern Pete (pattern AI)": lambda color: PatternPete(color, depths=[
+        st.session_state.get("black_depth", 2),
+        st.session_state.get("red_depth", 2)
+    ], time_budget=st.session_state.get("ai_think_time") or None,
+       selective=st.session_state.get("selective_search", False),
+       endgame_empties=st.session_state.get("endgame_empties", ENDGAME_EMPTIES),
+       book=OPENING_BOOK if st.session_state.get("use_book", True) else None),
+    "Monte Carlo Monty (MCTS AI)": lambda color: MonteCarloMonty(
+        color, time_budget=st.session_state.get("ai_think_time") or None),
 }
 
 def render_board(board):
@@ -176,6 +197,10 @@ def select_buttons():
             PLAYER_FACTORIES[black_choice](1),
             PLAYER_FACTORIES[red_choice](-1)
         ]
+        for player, opponent in zip(st.session_state.players, st.session_state.players[::-1]):
+            if (st.session_state.get("ponder", False) and isinstance(player, SearchPlayer)
+                    and isinstance(opponent, HumanPlayer)):
+                player.ponder = True  # keep searching while the human thinks
         st.session_state.current_player_idx = 0
         st.session_state.board_obj = Board()
         st.session_state.clicked_id = load_clicked_id()
@@ -342,6 +367,9 @@ def reset_clicked_cell(game_over):
     return
 
 def end_game():
+    for player in st.session_state.get("players", []):
+        if isinstance(player, SearchPlayer):
+            player.stop_pondering()
     board_obj = Board()
     board_obj.reset()
 
@@ -366,17 +394,20 @@ def main():
             st.session_state.rerun = False
     
     # Add this at the top of main()
+    # Search AIs think for exactly this long (deepening as far as they get); 0 = use the fixed depth below
     ai_think_time = st.sidebar.slider(
         "AI thinking time (seconds)", min_value=0.0, max_value=3.0, value=0.5, step=0.1
     )
     st.session_state.ai_think_time = ai_think_time
 
     black_depth = st.sidebar.slider(
-        "Black AI depth", min_value=1, max_value=5, value=2)
+        "Black AI depth", min_value=1, max_value=8, value=2,
+        help="Search depth when AI thinking time is 0")
     st.session_state.black_depth = black_depth
 
     red_depth = st.sidebar.slider(
-        "Red AI depth", min_value=1, max_value=5, value=2)
+        "Red AI depth", min_value=1, max_value=8, value=2,
+        help="Search depth when AI thinking time is 0")
     st.session_state.red_depth = red_depth
 
     edge_value_black = st.sidebar.slider(
@@ -395,6 +426,23 @@ def main():
         "Border value red for Edges Edgar", min_value=0, max_value=6, value=1)
     st.session_state.border_value_red = border_value_red
 
+    st.session_state.selective_search = st.sidebar.checkbox(
+        "Selective search (Minimax/Edges/Pattern)", value=False,
+        help="Searches deeper in the same time by pruning lines that look hopeless; no longer exact")
+
+    st.session_state.endgame_empties = st.sidebar.slider(
+        "Solve endgame from empties", min_value=0, max_value=14, value=ENDGAME_EMPTIES,
+        help="Minimax/Edges/Pattern play perfectly once this few squares are empty (0 = never)")
+
+    st.session_state.use_book = st.sidebar.checkbox(
+        "Opening book (Minimax/Edges/Pattern)", value=True, help="Play the first moves from the precomputed book")
+
+    st.session_state.ponder = st.sidebar.checkbox(
+        "Ponder on your time (Minimax/Edges/Pattern)", value=False,
+        help="The AI keeps searching while you think (up to a minute per move); uses the server's CPU")
+
+    show_search_stats = st.sidebar.checkbox("Show search stats", value=False)
+
     if "counter" not in st.session_state: # this counter is used to slow down reruns more and more (linear per rerun) to prevent firebase from crashing
         st.session_state.counter = 0
     
@@ -408,6 +456,11 @@ def main():
         st.session_state.board_obj = Board()
     board_obj = st.session_state.board_obj
 
+    # keeps legal moves/pass/game-over of the current position across reruns
+    if "game_state" not in st.session_state or st.session_state.game_state.board is not board_obj:
+        st.session_state.game_state = GameState(board_obj)
+    game_state = st.session_state.game_state
+
     if "players" not in st.session_state:
         st.session_state.players = [HumanPlayer(1), HumanPlayer(-1)]
 
@@ -442,10 +495,16 @@ def main():
         #     st.session_state.setup = True
     render_board(board_obj.state)
 
+    if show_search_stats:
+        for player in st.session_state.players:
+            if isinstance(player, SearchPlayer) and player.last_stats is not None:
+                st.sidebar.write(f"**{'⚫' if player.color == 1 else '🔴'} {type(player).__name__}**")
+                st.sidebar.json(player.last_stats.as_dict())
+
     if not st.session_state.rerun:
         # --- GAME OVER CHECK: If neither player can move, announce winner and stop ---
-        if not board_obj.has_valid_move(current_player.color):
-            if not board_obj.has_valid_move(-current_player.color):
+        if not game_state.has_valid_move(current_player.color):
+            if game_state.is_terminal():
                 if black_count > red_count:
                     st.success("Game ended. ⚫ Black won!")
                 elif red_count > black_count:
@@ -464,7 +523,8 @@ def main():
             not isinstance(st.session_state.players[1], HumanPlayer)
         ):           # AI move handling
             if not isinstance(current_player, HumanPlayer):
-                time.sleep(st.session_state.ai_think_time)
+                if not isinstance(current_player, (SearchPlayer, MonteCarloMonty)): # search AIs spend the thinking time searching
+                    time.sleep(st.session_state.ai_think_time)
                 move = current_player.get_move(board_obj)
                 if move:
                     board_obj.apply_move(current_player.color, *move)
@@ -0,0 +1,150 @@
+import numpy as np
+
+from game.board import Board, INNER_COLS
+
+# Vectorized counterpart of game.board: N positions held as uint64 bitboard arrays,
+# same bit layout as Board (bit row * 8 + col).
+_INNER = np.uint64(INNER_COLS)
+_START_BLACK = np.uint64((1 << 27) | (1 << 36))
+_START_RED = np.uint64((1 << 28) | (1 << 35))
+
+# (shift amount, shift left?, restrict to inner columns?) for the eight directions
+_SHIFTS = [
+    (np.uint64(1), True, True), (np.uint64(1), False, True),
+    (np.uint64(8), True, False), (np.uint64(8), False, False),
+    (np.uint64(9), True, True), (np.uint64(9), False, True),
+    (np.uint64(7), True, True), (np.uint64(7), False, True),
+]
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount64(x):
+        return np.bitwise_count(x).astype(np.int64)
+else:  # numpy < 2.0
+    def popcount64(x):
+        x = np.ascontiguousarray(x, dtype="<u8")
+        return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).astype(np.int64)
+
+
+def bits_to_planes(masks):
+    """(N,) uint64 masks -> (N, 8, 8) uint8 arrays of the set squares."""
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    return np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little").reshape(-1, 8, 8)
+
+
+def _shift(x, amount, left):
+    return x << amount if left else x >> amount
+
+
+def legal_moves_masks(own, opp):
+    """Legal-move masks for N (own, opp) uint64 pairs at once."""
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for amount, left, inner_only in _SHIFTS:
+        mask = opp & _INNER if inner_only else opp
+        x = mask & _shift(own, amount, left)
+        for _ in range(5):
+            x |= mask & _shift(x, amount, left)
+        moves |= _shift(x, amount, left)
+    return moves & empty
+
+
+def flips_masks(own, opp, move_bits):
+    """Discs turned over by playing move_bits (one bit per game, 0 for none)."""
+    flips = np.zeros_like(own)
+    for amount, left, inner_only in _SHIFTS:
+        mask = opp & _INNER if inner_only else opp
+        x = mask & _shift(move_bits, amount, left)
+        for _ in range(5):
+            x |= mask & _shift(x, amount, left)
+        bounded = (_shift(x, amount, left) & own) != 0
+        flips |= np.where(bounded, x, np.uint64(0))
+    return flips
+
+
+class BatchBoard:
+    """N independent Othello games advanced together with NumPy operations."""
+
+    def __init__(self, n):
+        self.black = np.full(n, _START_BLACK, dtype=np.uint64)
+        self.red = np.full(n, _START_RED, dtype=np.uint64)
+        self.side_to_move = np.ones(n, dtype=np.int8)
+
+    @classmethod
+    def from_boards(cls, boards, side_to_move=None):
+        batch = cls(0)
+        batch.black = np.array([b.black for b in boards], dtype=np.uint64)
+        batch.red = np.array([b.red for b in boards], dtype=np.uint64)
+        if side_to_move is None:
+            side_to_move = [b.side_to_move for b in boards]
+        batch.side_to_move = np.array(side_to_move, dtype=np.int8).reshape(len(boards))
+        return batch
+
+    def __len__(self):
+        return len(self.black)
+
+    def board(self, i):
+        """Game i as a regular Board."""
+        return Board.from_bits(int(self.black[i]), int(self.red[i]), int(self.side_to_move[i]))
+
+    def copy(self):
+        batch = BatchBoard(0)
+        batch.black = self.black.copy()
+        batch.red = self.red.copy()
+        batch.side_to_move = self.side_to_move.copy()
+        return batch
+
+    def sides(self, player=None):
+        """(own, opp) bitboards from player's point of view; player defaults to the side to move."""
+        if player is None:
+            player = self.side_to_move
+        is_black = np.broadcast_to(np.asarray(player) == 1, self.black.shape)
+        return np.where(is_black, self.black, self.red), np.where(is_black, self.red, self.black)
+
+    def valid_moves_mask(self, player=None):
+        own, opp = self.sides(player)
+        return legal_moves_masks(own, opp)
+
+    def valid_moves(self, player=None):
+        """(N, 64) bool array of legal squares, index row * 8 + col."""
+        return bits_to_planes(self.valid_moves_mask(player)).reshape(-1, 64).astype(bool)
+
+    def must_pass(self):
+        """Games where the side to move has no move but the opponent does."""
+        own, opp = self.sides()
+        return (legal_moves_masks(own, opp) == 0) & (legal_moves_masks(opp, own) != 0)
+
+    def game_over(self):
+        own, opp = self.sides()
+        return (legal_moves_masks(own, opp) == 0) & (legal_moves_masks(opp, own) == 0)
+
+    def apply_moves(self, squares):
+        """Play squares[i] (row * 8 + col, or -1 to pass) for the side to move in every game.
+
+        Returns a bool array like Board.apply_move: games whose move was illegal are left
+        untouched. A pass always succeeds and just hands the move to the other side.
+        """
+        squares = np.asarray(squares, dtype=np.int64)
+        playing = squares >= 0
+        move_bits = np.where(playing, np.uint64(1) << np.where(playing, squares, 0).astype(np.uint64), np.uint64(0))
+        own, opp = self.sides()
+        move_bits &= ~(own | opp)
+        flips = flips_masks(own, opp, move_bits)
+        applied = ~playing | (flips != 0)
+        placed = playing & applied
+        own = np.where(placed, own | flips | move_bits, own)
+        opp = np.where(placed, opp ^ flips, opp)
+        is_black = self.side_to_move == 1
+        self.black = np.where(is_black, own, opp)
+        self.red = np.where(is_black, opp, own)
+        self.side_to_move = np.where(applied, -self.side_to_move, self.side_to_move).astype(np.int8)
+        return applied
+
+    def count_pieces(self):
+        return popcount64(self.black), popcount64(self.red)
+
+    def to_planes(self, color=None):
+        """(N, 2, 8, 8) float32 [own pieces, opponent pieces] planes, the encoding of
+        rl_agent.utils.board_to_tensor; color defaults to the side to move."""
+        own, opp = self.sides(color)
+        return np.stack([bits_to_planes(own), bits_to_planes(opp)], axis=1).astype(np.float32)
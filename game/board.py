@@ -1,80 +1,342 @@
-import copy
+import random
+
 import numpy as np
 
-class Board:
-    def __init__(self):
-        self.state = np.zeros((8, 8), dtype=int)
-        self.reset()
+# Bitboard layout: bit (row * 8 + col) is set when that square holds a disc.
+# Black (1) and red (-1) are kept as two 64-bit Python ints.
+FULL_MASK = 0xFFFFFFFFFFFFFFFF
+INNER_COLS = 0x7E7E7E7E7E7E7E7E  # everything except columns 0 and 7
+CORNER_MASK = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+BORDER_MASK = 0x7E0000000000007E | 0x0081818181818100  # edges without the corners
 
-    def reset(self):
-        self.state.fill(0)
-        self.state[3][3], self.state[4][4] = 1, 1
-        self.state[3][4], self.state[4][3] = -1, -1
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(x):
+        return bin(x).count("1")
 
-    def is_legal_move(self, player, row, col):
-        if self.state[row][col] != 0:
-            return False
 
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        legal = False
-        modified_board = copy.deepcopy(self.state)
-        helper = copy.deepcopy(self.state)
-        for dr, dc in directions:
-            found_opponent = False
+def _build_rays():
+    # RAYS[sq] lists, per direction, the square bits walked outwards from sq.
+    rays = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        square_rays = []
+        for dr, dc in DIRECTIONS:
+            ray = []
             r, c = row + dr, col + dc
             while 0 <= r < 8 and 0 <= c < 8:
-                if self.state[r][c] == -player:
-                    found_opponent = True
-                    if 0 <= r + dr < 8 and 0 <= c + dc < 8:
-                        modified_board[r][c] = player
-                    else:
-                        modified_board = copy.deepcopy(helper)
-                elif self.state[r][c] == player:
-                    if found_opponent:
-                        helper = copy.deepcopy(modified_board)
-                        legal = True
-                    break
-                else:
-                    modified_board = copy.deepcopy(helper)
-                    break
+                ray.append(1 << (r * 8 + c))
                 r += dr
                 c += dc
-        if legal:
-            modified_board[row][col] = player
-            return modified_board
-        else:
+            if len(ray) >= 2:  # a flip needs at least one opponent disc and one own disc
+                square_rays.append(ray)
+        rays.append(square_rays)
+    return rays
+
+
+RAYS = _build_rays()
+
+
+def _build_zobrist(seed=0x07E110):
+    rng = random.Random(seed)
+    black = [rng.getrandbits(64) for _ in range(64)]
+    red = [rng.getrandbits(64) for _ in range(64)]
+    return {1: black, -1: red}, [b ^ r for b, r in zip(black, red)], rng.getrandbits(64)
+
+
+# ZOBRIST[player][sq] keys a disc, ZOBRIST_SWAP[sq] turns a black disc on sq into a red one
+# (or back) and ZOBRIST_SIDE is mixed in while red is to move.
+ZOBRIST, ZOBRIST_SWAP, ZOBRIST_SIDE = _build_zobrist()
+
+
+def zobrist_hash(black, red, side_to_move=1):
+    """Zobrist key of a position computed from scratch; Board keeps it up to date incrementally."""
+    h = ZOBRIST_SIDE if side_to_move == -1 else 0
+    for player, mask in ((1, black), (-1, red)):
+        keys = ZOBRIST[player]
+        while mask:
+            low = mask & -mask
+            h ^= keys[low.bit_length() - 1]
+            mask ^= low
+    return h
+
+
+def legal_moves_mask(own, opp):
+    """Bitmask of every square where `own` may play, via shift-and-mask flood fill."""
+    empty = ~(own | opp) & FULL_MASK
+    inner = opp & INNER_COLS
+    moves = 0
+
+    # east / west
+    x = inner & (own << 1)
+    x |= inner & (x << 1); x |= inner & (x << 1); x |= inner & (x << 1); x |= inner & (x << 1); x |= inner & (x << 1)
+    moves |= x << 1
+    x = inner & (own >> 1)
+    x |= inner & (x >> 1); x |= inner & (x >> 1); x |= inner & (x >> 1); x |= inner & (x >> 1); x |= inner & (x >> 1)
+    moves |= x >> 1
+
+    # south / north
+    x = opp & (own << 8)
+    x |= opp & (x << 8); x |= opp & (x << 8); x |= opp & (x << 8); x |= opp & (x << 8); x |= opp & (x << 8)
+    moves |= x << 8
+    x = opp & (own >> 8)
+    x |= opp & (x >> 8); x |= opp & (x >> 8); x |= opp & (x >> 8); x |= opp & (x >> 8); x |= opp & (x >> 8)
+    moves |= x >> 8
+
+    # diagonals
+    x = inner & (own << 9)
+    x |= inner & (x << 9); x |= inner & (x << 9); x |= inner & (x << 9); x |= inner & (x << 9); x |= inner & (x << 9)
+    moves |= x << 9
+    x = inner & (own >> 9)
+    x |= inner & (x >> 9); x |= inner & (x >> 9); x |= inner & (x >> 9); x |= inner & (x >> 9); x |= inner & (x >> 9)
+    moves |= x >> 9
+    x = inner & (own << 7)
+    x |= inner & (x << 7); x |= inner & (x << 7); x |= inner & (x << 7); x |= inner & (x << 7); x |= inner & (x << 7)
+    moves |= x << 7
+    x = inner & (own >> 7)
+    x |= inner & (x >> 7); x |= inner & (x >> 7); x |= inner & (x >> 7); x |= inner & (x >> 7); x |= inner & (x >> 7)
+    moves |= x >> 7
+
+    return moves & empty
+
+
+def neighbours_mask(mask):
+    """Squares adjacent (in any of the 8 directions) to a square in mask."""
+    inner_left = mask & 0xFEFEFEFEFEFEFEFE  # can step west
+    inner_right = mask & 0x7F7F7F7F7F7F7F7F  # can step east
+    adjacent = (mask << 8) | (mask >> 8)
+    adjacent |= (inner_right << 1) | (inner_right << 9) | (inner_right >> 7)
+    adjacent |= (inner_left >> 1) | (inner_left >> 9) | (inner_left << 7)
+    return adjacent & FULL_MASK
+
+
+def flips_mask(own, opp, sq):
+    """Bitmask of the opponent discs turned over when `own` plays on square index sq."""
+    flips = 0
+    for ray in RAYS[sq]:
+        line = 0
+        for bit in ray:
+            if opp & bit:
+                line |= bit
+            elif own & bit:
+                flips |= line
+                break
+            else:
+                break
+    return flips
+
+
+def bits_to_squares(mask):
+    """(row, col) tuples of the set bits in mask, in row-major order."""
+    squares = []
+    while mask:
+        low = mask & -mask
+        squares.append(divmod(low.bit_length() - 1, 8))
+        mask ^= low
+    return squares
+
+
+# --- Dihedral symmetries ---
+# Transform t (0..7) transposes when t & 4, flips rows when t & 2, then mirrors columns when t & 1.
+
+def _transpose(x):
+    t = 0x0F0F0F0F00000000 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (x ^ (x << 7))
+    x ^= t ^ (t >> 7)
+    return x
+
+
+def _flip_rows(x):
+    return int.from_bytes(x.to_bytes(8, "little"), "big")
+
+
+def _mirror_cols(x):
+    x = ((x >> 1) & 0x5555555555555555) | ((x & 0x5555555555555555) << 1)
+    x = ((x >> 2) & 0x3333333333333333) | ((x & 0x3333333333333333) << 2)
+    return ((x >> 4) & 0x0F0F0F0F0F0F0F0F) | ((x & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def transform_bits(mask, t):
+    """Apply symmetry t to a bitboard."""
+    if t & 4:
+        mask = _transpose(mask)
+    if t & 2:
+        mask = _flip_rows(mask)
+    if t & 1:
+        mask = _mirror_cols(mask)
+    return mask
+
+
+def transform_square(row, col, t):
+    """Where symmetry t sends the square (row, col)."""
+    if t & 4:
+        row, col = col, row
+    if t & 2:
+        row = 7 - row
+    if t & 1:
+        col = 7 - col
+    return row, col
+
+
+# INVERSE_TRANSFORM[t] undoes t: transform_square(*transform_square(r, c, t), INVERSE_TRANSFORM[t]) == (r, c)
+INVERSE_TRANSFORM = [
+    next(u for u in range(8) if transform_square(*transform_square(1, 2, t), u) == (1, 2))
+    for t in range(8)
+]
+
+
+def canonical_bits(black, red):
+    """Smallest (black, red) image of a position over the 8 symmetries, and the transform used."""
+    best = (black, red)
+    best_t = 0
+    for t in range(1, 8):
+        image = (transform_bits(black, t), transform_bits(red, t))
+        if image < best:
+            best, best_t = image, t
+    return best[0], best[1], best_t
+
+
+def bits_to_array(mask):
+    return np.unpackbits(np.array([mask], dtype="<u8").view(np.uint8), bitorder="little").reshape(8, 8)
+
+
+def array_to_bits(array):
+    return int(np.packbits(np.asarray(array, dtype=bool).ravel(), bitorder="little").view("<u8")[0])
+
+
+class Board:
+    # A position is two ints plus the side to move; no per-instance __dict__.
+    __slots__ = ("black", "red", "side_to_move", "zobrist", "_state")
+
+    def __init__(self):
+        self.black = 0
+        self.red = 0
+        self.side_to_move = 1
+        self.zobrist = 0  # 64-bit position key, includes the side to move
+        self._state = None
+        self.reset()
+
+    def reset(self):
+        self.black = (1 << 27) | (1 << 36)  # (3, 3) and (4, 4)
+        self.red = (1 << 28) | (1 << 35)  # (3, 4) and (4, 3)
+        self.side_to_move = 1
+        self.zobrist = zobrist_hash(self.black, self.red)
+        self._state = None
+
+    @property
+    def state(self):
+        # 8x8 int8 array view (1 black, -1 red, 0 empty), rebuilt lazily after a move.
+        # It is read-only: assign a new array to `state` to change the position.
+        if self._state is None:
+            state = bits_to_array(self.black).view(np.int8) - bits_to_array(self.red).view(np.int8)
+            state.flags.writeable = False
+            self._state = state
+        return self._state
+
+    @state.setter
+    def state(self, array):
+        array = np.asarray(array)
+        self.black = array_to_bits(array == 1)
+        self.red = array_to_bits(array == -1)
+        self.zobrist = zobrist_hash(self.black, self.red, self.side_to_move)
+        self._state = None
+
+    @classmethod
+    def from_bits(cls, black, red, side_to_move=1):
+        board = cls.__new__(cls)
+        board.black = black
+        board.red = red
+        board.side_to_move = side_to_move
+        board.zobrist = zobrist_hash(black, red, side_to_move)
+        board._state = None
+        return board
+
+    def pack(self):
+        """16-byte encoding of the discs (black then red bitboard, little endian)."""
+        return self.black.to_bytes(8, "little") + self.red.to_bytes(8, "little")
+
+    @classmethod
+    def from_packed(cls, data, side_to_move=1):
+        return cls.from_bits(int.from_bytes(data[:8], "little"), int.from_bytes(data[8:16], "little"), side_to_move)
+
+    def canonical(self):
+        """(black, red, transform) of the smallest symmetric image of this position.
+
+        Moves found on the canonical position map back with
+        transform_square(row, col, INVERSE_TRANSFORM[transform]).
+        """
+        return canonical_bits(self.black, self.red)
+
+    def canonical_hash(self):
+        """Zobrist key shared by all 8 symmetric images of this position (same side to move)."""
+        black, red, _ = canonical_bits(self.black, self.red)
+        return zobrist_hash(black, red, self.side_to_move)
+
+    def pass_turn(self):
+        """Hand the move to the other side without placing a disc."""
+        self.side_to_move = -self.side_to_move
+        self.zobrist ^= ZOBRIST_SIDE
+
+    def _sides(self, player):
+        return (self.black, self.red) if player == 1 else (self.red, self.black)
+
+    def valid_moves_mask(self, player):
+        """All legal moves for player as one 64-bit mask (bit row * 8 + col)."""
+        own, opp = self._sides(player)
+        return legal_moves_mask(own, opp)
+
+    def get_flips(self, player, row, col):
+        """Mask of the discs that player's move at (row, col) turns over; 0 if the move is illegal."""
+        own, opp = self._sides(player)
+        sq = row * 8 + col
+        if (own | opp) >> sq & 1:
+            return 0
+        return flips_mask(own, opp, sq)
+
+    def is_legal_move(self, player, row, col):
+        flips = self.get_flips(player, row, col)
+        if not flips:
             return False
+        new_board = self.copy()
+        new_board._place(player, row * 8 + col, flips)
+        return new_board.state.copy()
 
     def has_valid_move(self, player):
-        for row in range(8):
-            for col in range(8):
-                if self.is_legal_move(player, row, col) is not False:
-                    return True
-        return False
+        return self.valid_moves_mask(player) != 0
+
+    def mobility(self, player):
+        """Number of legal moves for player."""
+        return popcount(self.valid_moves_mask(player))
+
+    def frontier_mask(self, player):
+        """player's discs that touch an empty square."""
+        own, opp = self._sides(player)
+        return own & neighbours_mask(~(own | opp) & FULL_MASK)
+
+    def frontier(self, player):
+        return popcount(self.frontier_mask(player))
 
     def count_pieces(self):
-        black_count = np.sum(self.state == 1)
-        red_count = np.sum(self.state == -1)
+        black_count = popcount(self.black)
+        red_count = popcount(self.red)
         return black_count, red_count
-    
+
     def count_edges(self, edge_value, border_value):# WATCH OUT: returns only the right difference, not the actual scores!!
         # Base counts
-        black_count = np.sum(self.state == 1)
-        red_count = np.sum(self.state == -1)
+        black_count = popcount(self.black)
+        red_count = popcount(self.red)
 
-        # Corners
-        corners = [self.state[0, 0], self.state[0, 7], self.state[7, 0], self.state[7, 7]]
-        corner_score = sum(corners) * edge_value  # Will be negative if red controls more
+        # Corners: will be negative if red controls more
+        corner_score = (popcount(self.black & CORNER_MASK) - popcount(self.red & CORNER_MASK)) * edge_value
 
         # Borders (edges are excluded)
-        top_row = self.state[0, 1:7]
-        bottom_row = self.state[7, 1:7]
-        left_col = self.state[1:7, 0]
-        right_col = self.state[1:7, 7]
-
-        # Combine edge control — each element is -1, 0, or 1
-        border_control = np.sum(top_row) + np.sum(bottom_row) + np.sum(left_col) + np.sum(right_col)
-        border_score = border_control * border_value
+        border_score = (popcount(self.black & BORDER_MASK) - popcount(self.red & BORDER_MASK)) * border_value
 
         # Add corner + border influence to black's score - black can be negative, but thats fine for the difference
         black_count += corner_score + border_score
@@ -82,23 +344,64 @@ class Board:
         return black_count, red_count
 
 
-    def apply_move(self, player, row, col):
-        new_state = self.is_legal_move(player, row, col)
-        if new_state is not False:
-            self.state = new_state
-            return True
-        return False
+    def _place(self, player, sq, flips):
+        # Put player's disc on sq and turn over `flips`, in place; the other side moves next.
+        if player == 1:
+            self.black |= flips | (1 << sq)
+            self.red ^= flips
+        else:
+            self.red |= flips | (1 << sq)
+            self.black ^= flips
+        h = self.zobrist ^ ZOBRIST[player][sq]
+        while flips:
+            low = flips & -flips
+            h ^= ZOBRIST_SWAP[low.bit_length() - 1]
+            flips ^= low
+        if self.side_to_move == player:
+            h ^= ZOBRIST_SIDE
+            self.side_to_move = -player
+        self.zobrist = h
+        self._state = None
+
+    def apply_move(self, player, row, col, flips=None):
+        # flips can be passed in when the caller already queried get_flips
+        if flips is None:
+            flips = self.get_flips(player, row, col)
+        if not flips:
+            return False
+        self._place(player, row * 8 + col, flips)
+        return True
+
+    def make_move(self, player, row, col, flips=None):
+        """Apply a move in place and return an undo record for unmake_move (None if illegal)."""
+        sq = row * 8 + col
+        if flips is None:
+            flips = self.get_flips(player, row, col)
+        if not flips:
+            return None
+        record = (player, sq, flips, self.side_to_move, self.zobrist)
+        self._place(player, sq, flips)
+        return record
+
+    def unmake_move(self, record):
+        """Restore the position from before the make_move call that returned record."""
+        player, sq, flips, self.side_to_move, self.zobrist = record
+        if player == 1:
+            self.black ^= flips | (1 << sq)
+            self.red |= flips
+        else:
+            self.red ^= flips | (1 << sq)
+            self.black |= flips
+        self._state = None
 
     def get_valid_moves(self, player):
-        moves = []
-        for row in range(8):
-            for col in range(8):
-                if self.is_legal_move(player, row, col) is not False:
-                    moves.append((row, col))
-        return moves
+        return bits_to_squares(self.valid_moves_mask(player))
 
     def copy(self):
-        new_board = Board()
-        new_board.state = self.state.copy()
+        new_board = Board.__new__(Board)
+        new_board.black = self.black
+        new_board.red = self.red
+        new_board.side_to_move = self.side_to_move
+        new_board.zobrist = self.zobrist
+        new_board._state = self._state
         return new_board
-
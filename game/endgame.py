@@ -0,0 +1,217 @@
+"""
+Exact endgame solver: plays the last empty squares out to the end of the game.
+
+The score of a finished game is own discs minus opponent discs, the same count the
+app uses to name the winner. Passes are real here: a side without a move passes
+and the game only ends when neither side can move. Win/loss/draw mode searches
+the window (-1, 1) and only finds the sign of that score, which is faster.
+
+Move ordering: with many empties, the move that leaves the opponent the fewest
+replies comes first (fastest-first). Near the end, moves into regions with an odd
+number of empties come first (parity): the side that fills a region last usually
+keeps its discs there.
+
+Usage:
+    python -m game.endgame                       # solve times for 6..14 empties
+    python -m game.endgame --max-empties 18 --wld
+"""
+import argparse
+import random
+import sys
+import time
+
+from game.board import Board, CORNER_MASK, FULL_MASK, flips_mask, legal_moves_mask, popcount
+
+# Below this many empties moves are ordered by parity only; fastest-first costs a
+# move generation per move and only pays off higher up the tree.
+FASTEST_FIRST_EMPTIES = 6
+
+# Positions with at least this many empties go into the solver's transposition table.
+TT_EMPTIES = 6
+
+# Search players switch to the solver at this many empties by default.
+ENDGAME_EMPTIES = 12
+
+QUADRANTS = [
+    sum(1 << (row * 8 + col) for row in rows for col in cols)
+    for rows in (range(4), range(4, 8)) for cols in (range(4), range(4, 8))
+]
+
+
+class EndgameSolver:
+    """Negamax alpha-beta to the end of the game on raw bitboards; nodes counts the positions searched.
+
+    The transposition table maps (own, opp) to (lower bound, upper bound, best square)
+    and is kept for one solve() call.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.table = {}
+
+    def solve(self, board, player, exact=True):
+        """(score, move) for player to move on board: the final disc difference with best
+        play (only its sign with exact=False) and the move that gets it, None without a move."""
+        own, opp = (board.black, board.red) if player == 1 else (board.red, board.black)
+        self.nodes = 0
+        self.table = {}
+        moves = legal_moves_mask(own, opp)
+        if not moves:
+            return self._solve(own, opp, -65, 65), None
+        if not exact:
+            score, sq = self._root(own, opp, moves, -1, 1)
+            return score, divmod(sq, 8)
+        # the exact score by bisection with null-window probes, which are much cheaper
+        # than one full-window search; the table carries over from probe to probe
+        lower, upper, best_sq = -64, 64, None
+        while lower < upper:
+            guess = (lower + upper + 1) // 2
+            score, sq = self._root(own, opp, moves, guess - 1, guess, best_sq)
+            if score >= guess:
+                lower, best_sq = score, sq
+            else:
+                upper = score
+        if best_sq is None:  # every probe failed low: lost by the whole board
+            lower, best_sq = self._root(own, opp, moves, -65, 65)
+        return lower, divmod(best_sq, 8)
+
+    def _root(self, own, opp, moves, alpha, beta, hint=None):
+        best_score, best_sq = -65, None
+        for sq, flips in self._ordered(own, opp, moves, hint):
+            score = -self._solve(opp ^ flips, own | flips | (1 << sq), -beta, -max(alpha, best_score))
+            if score > best_score:
+                best_score, best_sq = score, sq
+                if best_score >= beta:
+                    break
+        return best_score, best_sq
+
+    def _solve(self, own, opp, alpha, beta):
+        self.nodes += 1
+        empty = ~(own | opp) & FULL_MASK
+        if not empty & (empty - 1):
+            return self._last_square(own, opp, empty)
+        key = None
+        hint = None
+        if popcount(empty) >= TT_EMPTIES:
+            key = (own, opp)
+            entry = self.table.get(key)
+            if entry is not None:
+                lower, upper, hint = entry
+                if lower >= beta:
+                    return lower
+                if upper <= alpha:
+                    return upper
+                alpha, beta = max(alpha, lower), min(beta, upper)
+                if lower == upper:
+                    return lower
+        moves = legal_moves_mask(own, opp)
+        if not moves:
+            if legal_moves_mask(opp, own):
+                return -self._solve(opp, own, -beta, -alpha)
+            return popcount(own) - popcount(opp)
+        alpha_orig = alpha
+        best, best_sq = -65, None
+        for sq, flips in self._ordered(own, opp, moves, hint):
+            score = -self._solve(opp ^ flips, own | flips | (1 << sq), -beta, -alpha)
+            if score > best:
+                best, best_sq = score, sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if key is not None:
+            lower, upper, _ = self.table.get(key, (-65, 65, None))
+            if best <= alpha_orig:
+                upper = best
+            elif best >= beta:
+                lower = best
+            else:
+                lower = upper = best
+            self.table[key] = (lower, upper, best_sq)
+        return best
+
+    def _last_square(self, own, opp, empty):
+        # one empty square left (or none): whoever can play it does, no search needed
+        diff = popcount(own) - popcount(opp)
+        if not empty:
+            return diff
+        sq = empty.bit_length() - 1
+        flips = flips_mask(own, opp, sq)
+        if flips:
+            return diff + 2 * popcount(flips) + 1
+        flips = flips_mask(opp, own, sq)
+        if flips:
+            return diff - 2 * popcount(flips) - 1
+        return diff
+
+    def _ordered(self, own, opp, moves, hint=None):
+        # (square, flips) pairs: the table's best move, then odd regions first, then
+        # corners; fastest-first on top when there are enough empties left for it to pay
+        empty = ~(own | opp) & FULL_MASK
+        odd = 0
+        for quadrant in QUADRANTS:
+            if popcount(empty & quadrant) & 1:
+                odd |= quadrant
+        fastest_first = popcount(empty) >= FASTEST_FIRST_EMPTIES
+        ordered = []
+        while moves:
+            low = moves & -moves
+            moves ^= low
+            sq = low.bit_length() - 1
+            flips = flips_mask(own, opp, sq)
+            key = (0 if odd & low else 2) + (0 if CORNER_MASK & low else 1)
+            if sq == hint:
+                key = -1
+            elif fastest_first:
+                key += 4 * popcount(legal_moves_mask(opp ^ flips, own | flips | low))
+            ordered.append((key, sq, flips))
+        ordered.sort()
+        return [(sq, flips) for _, sq, flips in ordered]
+
+
+def random_position(empties, rng):
+    """(board, player) from a random game with `empties` empty squares, player able to move."""
+    while True:
+        board, player = Board(), 1
+        while 64 - popcount(board.black | board.red) > empties:
+            moves = board.get_valid_moves(player)
+            if not moves:
+                player = -player
+                moves = board.get_valid_moves(player)
+                if not moves:
+                    break
+            board.apply_move(player, *rng.choice(moves))
+            player = -player
+        if 64 - popcount(board.black | board.red) == empties and board.has_valid_move(player):
+            return board, player
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve time of the exact endgame solver by number of empties.")
+    parser.add_argument('--min-empties', type=int, default=6, help='Fewest empties (default: 6)')
+    parser.add_argument('--max-empties', type=int, default=14, help='Most empties (default: 14)')
+    parser.add_argument('--positions', type=int, default=5, help='Random positions per empties count (default: 5)')
+    parser.add_argument('--wld', action='store_true', help='Win/loss/draw instead of exact score')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    solver = EndgameSolver()
+    mode = "win/loss/draw" if args.wld else "exact score"
+    print(f"{mode}, {args.positions} positions per row")
+    print(f"{'empties':>7} {'mean time':>10} {'max time':>10} {'mean nodes':>12} {'nps':>10}")
+    for empties in range(args.min_empties, args.max_empties + 1):
+        times, nodes = [], []
+        for _ in range(args.positions):
+            board, player = random_position(empties, rng)
+            start = time.perf_counter()
+            solver.solve(board, player, exact=not args.wld)
+            times.append(time.perf_counter() - start)
+            nodes.append(solver.nodes)
+        print(f"{empties:>7} {sum(times) / len(times):>9.3f}s {max(times):>9.3f}s "
+              f"{sum(nodes) / len(nodes):>12,.0f} {sum(nodes) / max(sum(times), 1e-9):>10,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+from game.board import Board, bits_to_squares
+
+
+class GameState:
+    """A Board with its legal moves, pass and game-over status memoized per position.
+
+    Both sides' move masks are computed together the first time anything is asked
+    about a position, and only recomputed once the board's discs change (a move was
+    applied, or a new state assigned), so repeated checks within a ply are free.
+    """
+
+    __slots__ = ("board", "_key", "_masks", "_moves")
+
+    def __init__(self, board=None):
+        self.board = board if board is not None else Board()
+        self._key = None
+        self._masks = None
+        self._moves = {}
+
+    def _refresh(self):
+        board = self.board
+        key = (board.black, board.red)
+        if key != self._key:
+            self._key = key
+            self._masks = {1: board.valid_moves_mask(1), -1: board.valid_moves_mask(-1)}
+            self._moves = {}
+        return self._masks
+
+    def _player(self, player):
+        return self.board.side_to_move if player is None else player
+
+    def valid_moves_mask(self, player=None):
+        return self._refresh()[self._player(player)]
+
+    def get_valid_moves(self, player=None):
+        player = self._player(player)
+        masks = self._refresh()
+        if player not in self._moves:
+            self._moves[player] = bits_to_squares(masks[player])
+        return self._moves[player]
+
+    def has_valid_move(self, player=None):
+        return self._refresh()[self._player(player)] != 0
+
+    def must_pass(self, player=None):
+        """player (default: side to move) has no move but the opponent does."""
+        player = self._player(player)
+        masks = self._refresh()
+        return masks[player] == 0 and masks[-player] != 0
+
+    def is_terminal(self):
+        masks = self._refresh()
+        return masks[1] == 0 and masks[-1] == 0
+
+    def apply_move(self, player, row, col):
+        # the next query sees new discs and recomputes
+        return self.board.apply_move(player, row, col)
+
+    def pass_turn(self):
+        self.board.pass_turn()
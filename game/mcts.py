@@ -0,0 +1,149 @@
+"""
+Monte Carlo tree search (UCT) with batched random playouts.
+
+Every round walks the tree batch_size times before any playout is run. Each walk
+adds a virtual visit to the nodes it passes, so the walks spread over different
+leaves. The random games from all those leaves are then played out together on a
+BatchBoard, and the results are backed up along each path. The Python per-node
+work is only in the tree; the playouts themselves are NumPy operations over the
+whole batch.
+"""
+import math
+import time
+
+import numpy as np
+
+from game.batch_board import BatchBoard, bits_to_planes, legal_moves_masks
+from game.board import bits_to_squares, flips_mask, legal_moves_mask
+
+PASS = -1  # the move of a side that has no legal move but whose opponent has one
+
+
+class Node:
+    """A position in the search tree.
+
+    wins and visits are counted for the player who moved into the node (-player),
+    so a parent picks the child that is best for itself.
+    """
+
+    __slots__ = ("black", "red", "player", "parent", "move", "children", "untried", "visits", "wins")
+
+    def __init__(self, black, red, player, parent=None, move=None):
+        self.black = black
+        self.red = red
+        self.player = player  # side to move
+        self.parent = parent
+        self.move = move  # square played to get here (PASS for a pass), None at the root
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+        own, opp = (black, red) if player == 1 else (red, black)
+        moves = legal_moves_mask(own, opp)
+        if moves:
+            self.untried = [row * 8 + col for row, col in bits_to_squares(moves)]
+        elif legal_moves_mask(opp, own):
+            self.untried = [PASS]
+        else:
+            self.untried = []  # game over
+
+    def expand(self, sq):
+        black, red, player = self.black, self.red, self.player
+        if sq != PASS:
+            own, opp = (black, red) if player == 1 else (red, black)
+            flips = flips_mask(own, opp, sq)
+            own |= flips | (1 << sq)
+            opp ^= flips
+            black, red = (own, opp) if player == 1 else (opp, own)
+        child = Node(black, red, -player, self, sq)
+        self.children.append(child)
+        return child
+
+
+def random_playouts(black, red, side_to_move, rng):
+    """Play every game to the end with uniformly random legal moves.
+
+    Takes uint64 bitboard arrays and an int8 side-to-move array. Returns the
+    winner of each game: 1 black, -1 red, 0 draw.
+    """
+    batch = BatchBoard(0)
+    batch.black, batch.red, batch.side_to_move = black, red, side_to_move
+    while True:
+        own, opp = batch.sides()
+        moves = legal_moves_masks(own, opp)
+        stuck = moves == 0
+        if stuck.all() and not legal_moves_masks(opp, own).any():
+            break
+        # a random legal square per game: the largest random key among the legal ones;
+        # games without a move pass, finished games just keep passing
+        keys = rng.random((len(moves), 64)) * bits_to_planes(moves).reshape(-1, 64)
+        batch.apply_moves(np.where(stuck, PASS, np.argmax(keys, axis=1)))
+    black_count, red_count = batch.count_pieces()
+    return np.sign(black_count - red_count)
+
+
+class MCTS:
+    """UCT search from a Board; see the module docstring.
+
+    exploration is the UCT constant c in wins/visits + c * sqrt(ln(parent visits) / visits).
+    """
+
+    def __init__(self, exploration=1.4, batch_size=128, seed=None):
+        self.exploration = exploration
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.root = None
+        self.playouts = 0  # playouts run by the latest search
+
+    def search(self, board, player, iterations=1000, time_budget=None):
+        """Most visited move for player after `iterations` playouts, or after time_budget
+        seconds if given (at least one batch is always run). None without legal moves."""
+        self.root = root = Node(board.black, board.red, player)
+        self.playouts = 0
+        if not root.untried or root.untried == [PASS]:
+            return None
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        while True:
+            size = self.batch_size if deadline is not None else min(self.batch_size, max(1, iterations - self.playouts))
+            self._run_batch(root, size)
+            self.playouts += size
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    break
+            elif self.playouts >= iterations:
+                break
+        best = max(root.children, key=lambda child: child.visits)
+        return divmod(best.move, 8)
+
+    def _select(self, root):
+        # walk down by UCT to a node with an untried move (expanded here) or to the end
+        # of the game; every node on the way gets its visit now, its result later
+        node = root
+        node.visits += 1
+        path = [node]
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            c = self.exploration
+            node = max(node.children,
+                       key=lambda child: child.wins / child.visits + c * math.sqrt(log_visits / child.visits))
+            node.visits += 1
+            path.append(node)
+        if node.untried:
+            sq = node.untried.pop(self.rng.integers(len(node.untried)))
+            node = node.expand(sq)
+            node.visits += 1
+            path.append(node)
+        return path
+
+    def _run_batch(self, root, size):
+        paths = [self._select(root) for _ in range(size)]
+        leaves = [path[-1] for path in paths]
+        winners = random_playouts(
+            np.array([leaf.black for leaf in leaves], dtype=np.uint64),
+            np.array([leaf.red for leaf in leaves], dtype=np.uint64),
+            np.array([leaf.player for leaf in leaves], dtype=np.int8),
+            self.rng,
+        )
+        for path, winner in zip(paths, winners.tolist()):
+            for node in path:
+                # scored for the player who moved into the node
+                node.wins += 0.5 if winner == 0 else float(winner == -node.player)
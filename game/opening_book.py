@@ -0,0 +1,164 @@
+"""
+Opening book: good moves for the first plies, looked up instead of searched.
+
+The book is an open-addressed hash table in a .npy file, memory-mapped when loaded.
+It is indexed by Board.canonical_hash(), so the 8 symmetric images of a position
+share one record. A record holds up to MAX_MOVES moves, as squares of the canonical
+position, with weights (the best move has the largest).
+
+The book is built offline by deep search. From the start position, every move of
+every book position is searched to --depth. Moves within --margin of the best go
+in the book, weighted by how close they are. The positions after them are expanded
+in turn, up to --plies.
+
+Usage:
+    python -m game.opening_book --plies 10 --depth 6     # build game/opening_book.npy
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from game.board import Board, INVERSE_TRANSFORM, transform_square, zobrist_hash
+from game.evaluation import MobilityEvaluator, edge_control
+from game.search import AlphaBeta, TranspositionTable
+
+BOOK_PATH = os.path.join(os.path.dirname(__file__), "opening_book.npy")
+
+MAX_MOVES = 4
+
+RECORD = np.dtype([("key", "<u8"), ("squares", "u1", (MAX_MOVES,)), ("weights", "<u2", (MAX_MOVES,))])
+
+
+class OpeningBook:
+    """Read-only book loaded from a .npy file (see the module docstring)."""
+
+    def __init__(self, path=BOOK_PATH):
+        self.path = path
+        self.table = np.load(path, mmap_mode="r")
+        self.mask = len(self.table) - 1
+
+    def __len__(self):
+        return int(np.count_nonzero(self.table["key"]))
+
+    def _record(self, key):
+        i = key & self.mask
+        while True:
+            record = self.table[i]
+            stored = int(record["key"])
+            if stored == key:
+                return record
+            if stored == 0:
+                return None
+            i = (i + 1) & self.mask
+
+    def lookup(self, board, player):
+        """[((row, col), weight), ...] for player to move on board; empty when out of book."""
+        black, red, t = board.canonical()
+        record = self._record(zobrist_hash(black, red, player))
+        if record is None:
+            return []
+        inverse = INVERSE_TRANSFORM[t]
+        moves = []
+        for sq, weight in zip(record["squares"].tolist(), record["weights"].tolist()):
+            if weight:
+                moves.append((transform_square(sq >> 3, sq & 7, inverse), weight))
+        return moves
+
+    def choose(self, board, player, sample=False, rng=random):
+        """The book move (the heaviest, or drawn by weight with sample=True), None when out of book."""
+        moves = [(move, weight) for move, weight in self.lookup(board, player) if board.get_flips(player, *move)]
+        if not moves:
+            return None
+        if sample:
+            return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+        return max(moves, key=lambda item: item[1])[0]
+
+
+def load_book(path=BOOK_PATH):
+    """The OpeningBook at path, or None if there is none."""
+    try:
+        return OpeningBook(path)
+    except FileNotFoundError:
+        return None
+
+
+def build_table(entries):
+    """Hash table array for {canonical hash: [(square, weight), ...]}, at most half full."""
+    size = 1
+    while size < 2 * max(len(entries), 1):
+        size *= 2
+    table = np.zeros(size, dtype=RECORD)
+    for key, moves in entries.items():
+        i = key & (size - 1)
+        while table[i]["key"]:
+            i = (i + 1) & (size - 1)
+        table[i]["key"] = key
+        for j, (sq, weight) in enumerate(moves[:MAX_MOVES]):
+            table[i]["squares"][j] = sq
+            table[i]["weights"][j] = weight
+    return table
+
+
+def build(evaluate, plies, depth, margin, log=None):
+    """{canonical hash: [(square, weight), ...]} from deep searches of the opening tree."""
+    searcher = AlphaBeta(evaluate, TranspositionTable(64))
+    entries = {}
+    frontier = [(Board(), 1)]
+    for ply in range(plies):
+        next_frontier = []
+        for board, player in frontier:
+            black, red, _ = board.canonical()
+            canonical = Board.from_bits(black, red, player)
+            key = canonical.zobrist
+            if key in entries:
+                continue
+            scores = []
+            for row, col in canonical.get_valid_moves(player):
+                child = canonical.copy()
+                child.apply_move(player, row, col)
+                score, _ = searcher.search(child, -player, depth - 1)
+                scores.append((-score, row * 8 + col))
+            if not scores:
+                continue
+            best = max(score for score, _ in scores)
+            kept = sorted((item for item in scores if item[0] >= best - margin), key=lambda item: (-item[0], item[1]))
+            kept = kept[:MAX_MOVES]
+            # weight 1000 for the best move, falling off with the score difference
+            entries[key] = [(sq, max(1, round(1000 * math.exp(score - best)))) for score, sq in kept]
+            for _, sq in kept:
+                child = canonical.copy()
+                child.apply_move(player, sq >> 3, sq & 7)
+                if child.has_valid_move(-player):
+                    next_frontier.append((child, -player))
+        frontier = next_frontier
+        if log:
+            log(f"ply {ply + 1}: {len(entries)} positions in book, {len(frontier)} to expand")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the opening book by deep search.")
+    parser.add_argument('--plies', type=int, default=10, help='Plies from the start covered (default: 10)')
+    parser.add_argument('--depth', type=int, default=6, help='Search depth per move (default: 6)')
+    parser.add_argument('--margin', type=float, default=1.0,
+                        help='Keep moves scoring at most this much below the best (default: 1)')
+    parser.add_argument('--out', default=BOOK_PATH, help=f'Output file (default: {BOOK_PATH})')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    evaluate = MobilityEvaluator(edge_control(3, 1), mobility_weight=1, frontier_weight=1)
+    entries = build(evaluate, args.plies, args.depth, args.margin, log=print)
+    table = build_table(entries)
+    np.save(args.out, table)
+    print(f"{len(entries)} positions, {table.nbytes:,} bytes, written to {args.out} "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
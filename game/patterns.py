@@ -0,0 +1,359 @@
+"""
+Pattern evaluator: Logistello-style weight tables over edge, corner, line and
+diagonal patterns, fitted by regression on game records.
+
+Each pattern is a list of squares. Its base-3 index (0 empty, 1 own disc, 2
+opponent disc per square) selects a weight from the pattern's table. All
+symmetric copies of a pattern share the table. A pattern that maps onto itself
+under a symmetry (a line read backwards, say) gives a configuration and its
+mirror image the same weight, so the score of a position is the same for all 8
+of its images. The score is the sum over every copy plus a bias, in units of
+final disc difference, with one set of tables per game stage.
+
+An index is built from whole bytes of the bitboards, not square by square. A
+pattern in a few rows reads those rows, one in a few columns reads rows of the
+transposed board, and a diagonal reads one row of a board sheared so that its
+diagonals become rows. A byte maps to its share of the index through a
+256-entry table.
+
+Usage:
+    python -m game.patterns generate --games 10000   # self-play records -> game/pattern_records.npz
+    python -m game.patterns train                    # fit -> game/pattern_weights.npz
+    python -m game.patterns check                    # same score for all 8 images of a position
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from game.board import FULL_MASK, Board, _transpose, popcount, transform_bits, transform_square
+from game.endgame import random_position
+from game.evaluation import MobilityEvaluator, edge_control
+from game.search import AlphaBeta, TranspositionTable
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(__file__), "pattern_weights.npz")
+RECORDS_PATH = os.path.join(os.path.dirname(__file__), "pattern_records.npz")
+
+# (name, squares) in index order; the first square is the lowest base-3 digit
+PATTERNS = [
+    ("edge_2x", [(0, c) for c in range(8)] + [(1, 1), (1, 6)]),
+    ("corner_3x3", [(r, c) for r in range(3) for c in range(3)]),
+    ("corner_2x5", [(r, c) for r in range(2) for c in range(5)]),
+    ("line_2", [(1, c) for c in range(8)]),
+    ("line_3", [(2, c) for c in range(8)]),
+    ("line_4", [(3, c) for c in range(8)]),
+    ("diag_8", [(i, i) for i in range(8)]),
+    ("diag_7", [(i, i + 1) for i in range(7)]),
+    ("diag_6", [(i, i + 2) for i in range(6)]),
+    ("diag_5", [(i, i + 3) for i in range(5)]),
+    ("diag_4", [(i, i + 4) for i in range(4)]),
+]
+
+# Weight sets by empty squares: 45-60, 30-44, 15-29, 0-14 empties
+STAGE_EMPTIES = 15
+STAGES = 4
+
+
+def stage(empties):
+    return min(empties // STAGE_EMPTIES, STAGES - 1)
+
+
+def _instances(squares):
+    # the distinct symmetric images of a pattern, each in its own index order
+    seen = set()
+    instances = []
+    for t in range(8):
+        image = [transform_square(row, col, t) for row, col in squares]
+        if frozenset(image) not in seen:
+            seen.add(frozenset(image))
+            instances.append(image)
+    return instances
+
+
+def _canonical_table(squares):
+    # index -> the smallest index among the images of its configuration under the
+    # symmetries that map the pattern onto its own squares
+    n = len(squares)
+    digits = np.arange(3 ** n)[:, None] // 3 ** np.arange(n) % 3
+    canonical = np.arange(3 ** n)
+    for t in range(8):
+        image = [transform_square(row, col, t) for row, col in squares]
+        if set(image) == set(squares):
+            order = [squares.index(sq) for sq in image]
+            canonical = np.minimum(canonical, digits[:, order] @ 3 ** np.arange(n))
+    return canonical
+
+
+# per pattern, the index whose weight every index uses
+CANONICAL = [_canonical_table(squares) for _, squares in PATTERNS]
+
+
+def _diagonals(x):
+    # shears the board so that every diagonal lands in a single row (sharing it
+    # with the wrapped-around diagonal of complementary length)
+    x ^= 0xAAAAAAAAAAAAAAAA & (x ^ ((x >> 8 | x << 56) & FULL_MASK))
+    x ^= 0xCCCCCCCCCCCCCCCC & (x ^ ((x >> 16 | x << 48) & FULL_MASK))
+    x ^= 0xF0F0F0F0F0F0F0F0 & (x ^ ((x >> 32 | x << 32) & FULL_MASK))
+    return x
+
+
+def _anti_diagonals(x):
+    # the same for the anti-diagonals
+    x ^= 0x5555555555555555 & (x ^ ((x >> 8 | x << 56) & FULL_MASK))
+    x ^= 0x3333333333333333 & (x ^ ((x >> 16 | x << 48) & FULL_MASK))
+    x ^= 0x0F0F0F0F0F0F0F0F & (x ^ ((x >> 32 | x << 32) & FULL_MASK))
+    return x
+
+
+# Bitboard views a pattern's squares are read from, a byte (row) at a time.
+VIEWS = [lambda x: x, _transpose, _diagonals, _anti_diagonals]
+
+
+def _byte_table(positions):
+    # byte value -> sum of 3 ** digit over the set bits, for {bit: digit} positions
+    return [sum(3 ** digit for bit, digit in positions.items() if value >> bit & 1) for value in range(256)]
+
+
+def _gathers(image):
+    """[(source, table)] with index = sum(table[own byte] + 2 * table[opp byte]).
+
+    A source is byte `row` of view v of the board; the view with the fewest bytes
+    covering the image is used.
+    """
+    best = None
+    for v, view in enumerate(VIEWS):
+        rows = {}
+        for digit, (row, col) in enumerate(image):
+            sq = view(1 << (row * 8 + col)).bit_length() - 1
+            rows.setdefault(sq >> 3, {})[sq & 7] = digit
+        if best is None or len(rows) < len(best):
+            best = [(v * 8 + row, positions) for row, positions in sorted(rows.items())]
+    return [(source, _byte_table(positions)) for source, positions in best]
+
+
+def _layout():
+    # (pattern, [(source, table, doubled table), ...]) per pattern copy, by number of gathers
+    instances = []
+    for p, (_, squares) in enumerate(PATTERNS):
+        for image in _instances(squares):
+            instances.append((p, [(source, table, [2 * v for v in table]) for source, table in _gathers(image)]))
+    return sorted(instances, key=lambda instance: len(instance[1]))
+
+
+INSTANCES = _layout()
+
+# pattern of every copy, in the order indices() lists them
+INSTANCE_PATTERNS = [p for p, _ in INSTANCES]
+
+# the copies split by number of gathers, so indices() can unroll the common cases
+_ONE = [parts[0] for _, parts in INSTANCES if len(parts) == 1]
+_TWO = [parts[0] + parts[1] for _, parts in INSTANCES if len(parts) == 2]
+_MORE = [parts for _, parts in INSTANCES if len(parts) > 2]
+
+
+def _bytes(x):
+    # the bytes of every view, view v's row r at v * 8 + r
+    return (
+        x.to_bytes(8, "little") + _transpose(x).to_bytes(8, "little")
+        + _diagonals(x).to_bytes(8, "little") + _anti_diagonals(x).to_bytes(8, "little")
+    )
+
+
+def indices(own, opp):
+    """Base-3 index of every pattern copy (in INSTANCES order) for the side owning `own`."""
+    o = _bytes(own)
+    x = _bytes(opp)
+    return (
+        [t[o[s]] + d[x[s]] for s, t, d in _ONE]
+        + [t1[o[s1]] + d1[x[s1]] + t2[o[s2]] + d2[x[s2]] for s1, t1, d1, s2, t2, d2 in _TWO]
+        + [sum([t[o[s]] + d[x[s]] for s, t, d in parts]) for parts in _MORE]
+    )
+
+
+class PatternEvaluator:
+    """Scores positions with the pattern tables in a weights file (see the module docstring)."""
+
+    def __init__(self, path=WEIGHTS_PATH):
+        self.path = path
+        # per stage, the weight table of every pattern copy as a list (faster to index than arrays)
+        self.tables = []
+        with np.load(path) as data:
+            self.bias = data["bias"].tolist()
+            for s in range(STAGES):
+                tables = [data[name][s][CANONICAL[p]].tolist() for p, (name, _) in enumerate(PATTERNS)]
+                self.tables.append([tables[p] for p in INSTANCE_PATTERNS])
+
+    def __call__(self, board, player):
+        own, opp = (board.black, board.red) if player == 1 else (board.red, board.black)
+        s = stage(64 - popcount(own | opp))
+        return self.bias[s] + sum(map(list.__getitem__, self.tables[s], indices(own, opp)))
+
+    def __reduce__(self):
+        # parallel search pickles the evaluator per task: send the path, not the tables
+        return (load_pattern_evaluator, (self.path,))
+
+    def __repr__(self):
+        # also the key of its ProbCut parameters, so the shipped weights get no machine-specific path
+        return "PatternEvaluator()" if self.path == WEIGHTS_PATH else f"PatternEvaluator({self.path!r})"
+
+
+_LOADED = {}
+
+
+def load_pattern_evaluator(path=WEIGHTS_PATH):
+    """PatternEvaluator for path, loaded once per process."""
+    if path not in _LOADED:
+        _LOADED[path] = PatternEvaluator(path)
+    return _LOADED[path]
+
+
+def generate(games, depth=2, epsilon=0.1, random_plies=6, seed=0, log=None):
+    """Self-play records: arrays black, red, player (to move) and the game's final
+    black minus red disc count, one row per position where the side to move had a move.
+
+    Both sides search to depth with mobility + edge control; the first random_plies
+    moves and an epsilon share of the rest are random, so the games differ.
+    """
+    rng = random.Random(seed)
+    searcher = AlphaBeta(MobilityEvaluator(edge_control(3, 1), 1, 1), TranspositionTable(16))
+    black, red, player, outcome = [], [], [], []
+    for game in range(games):
+        board, p, plies = Board(), 1, 0
+        start = len(black)
+        while True:
+            moves = board.get_valid_moves(p)
+            if not moves:
+                if not board.has_valid_move(-p):
+                    break
+                p = -p
+                continue
+            black.append(board.black)
+            red.append(board.red)
+            player.append(p)
+            if plies < random_plies or rng.random() < epsilon:
+                move = rng.choice(moves)
+            else:
+                _, move = searcher.search(Board.from_bits(board.black, board.red, p), p, depth)
+            board.apply_move(p, *move)
+            p = -p
+            plies += 1
+        black_count, red_count = board.count_pieces()
+        outcome.extend([black_count - red_count] * (len(black) - start))
+        if log and (game + 1) % 100 == 0:
+            log(f"{game + 1}/{games} games, {len(black)} positions")
+    return {
+        "black": np.array(black, dtype=np.uint64),
+        "red": np.array(red, dtype=np.uint64),
+        "player": np.array(player, dtype=np.int8),
+        "outcome": np.array(outcome, dtype=np.int8),
+    }
+
+
+def fit(records, epochs=60, learning_rate=1.0, regularization=5.0, holdout=0.1, seed=0, log=None):
+    """Weight tables and biases fitted to the records' outcomes (from the mover's view)
+    by gradient descent on the squared error, one stage at a time.
+
+    Each weight moves by its error sum over (occurrences + regularization), so rare
+    configurations stay near 0. Only canonical indices (see CANONICAL) get weights. Returns {pattern name: (STAGES, 3**n) array, "bias": (STAGES,)}.
+    """
+    n = len(records["player"])
+    own = np.where(records["player"] == 1, records["black"], records["red"])
+    opp = np.where(records["player"] == 1, records["red"], records["black"])
+    X = np.array([indices(int(o), int(p)) for o, p in zip(own, opp)], dtype=np.int64).reshape(n, len(INSTANCES))
+    for i, p in enumerate(INSTANCE_PATTERNS):
+        X[:, i] = CANONICAL[p][X[:, i]]
+    y = records["outcome"].astype(np.float64) * records["player"]
+    empties = 64 - np.array([popcount(int(o) | int(p)) for o, p in zip(own, opp)])
+    stages = np.minimum(empties // STAGE_EMPTIES, STAGES - 1)
+    test = np.random.default_rng(seed).random(n) < holdout
+
+    weights = {name: np.zeros((STAGES, 3 ** len(squares))) for name, squares in PATTERNS}
+    weights["bias"] = np.zeros(STAGES)
+    columns = {p: [i for i, q in enumerate(INSTANCE_PATTERNS) if q == p] for p in range(len(PATTERNS))}
+    for s in range(STAGES):
+        train_rows = (stages == s) & ~test
+        test_rows = (stages == s) & test
+        if not train_rows.any():
+            continue
+        Xs, ys = X[train_rows], y[train_rows]
+        tables = [weights[name][s] for name, _ in PATTERNS]
+        counts = [
+            sum(np.bincount(Xs[:, i], minlength=len(tables[p])) for i in columns[p])
+            for p in range(len(PATTERNS))
+        ]
+
+        def predict(rows_x, bias):
+            pred = np.full(len(rows_x), bias)
+            for i, p in enumerate(INSTANCE_PATTERNS):
+                pred += tables[p][rows_x[:, i]]
+            return pred
+
+        bias = ys.mean()
+        # every copy moves at once, so each takes its share of the step
+        step = learning_rate / len(INSTANCES)
+        for _ in range(epochs):
+            err = ys - predict(Xs, bias)
+            for p, table in enumerate(tables):
+                grad = sum(np.bincount(Xs[:, i], weights=err, minlength=len(table)) for i in columns[p])
+                table += step * grad / (counts[p] + regularization)
+        weights["bias"][s] = bias
+        if log:
+            train_mse = np.mean((ys - predict(Xs, bias)) ** 2)
+            test_mse = np.mean((y[test_rows] - predict(X[test_rows], bias)) ** 2) if test_rows.any() else float("nan")
+            log(f"stage {s}: {train_rows.sum()} positions, rmse {np.sqrt(train_mse):.2f} train, "
+                f"{np.sqrt(test_mse):.2f} held out (outcome sd {ys.std():.2f})")
+    return weights
+
+
+def check(evaluate, positions=200, seed=0):
+    """Positions out of `positions` random ones whose 8 images score differently."""
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(positions):
+        board, player = random_position(rng.randrange(4, 60), rng)
+        scores = {
+            evaluate(Board.from_bits(transform_bits(board.black, t), transform_bits(board.red, t), player), player)
+            for t in range(8)
+        }
+        if max(scores) - min(scores) > 1e-9:
+            failures += 1
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate game records and fit the pattern evaluator.")
+    parser.add_argument('command', choices=['generate', 'train', 'check'])
+    parser.add_argument('--games', type=int, default=10000, help='Self-play games to generate (default: 10000)')
+    parser.add_argument('--depth', type=int, default=2, help='Search depth of the self-play (default: 2)')
+    parser.add_argument('--epochs', type=int, default=60, help='Training epochs per stage (default: 60)')
+    parser.add_argument('--records', default=RECORDS_PATH, help='Game records file')
+    parser.add_argument('--weights', default=WEIGHTS_PATH, help='Weights file written by train')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'generate':
+        records = generate(args.games, args.depth, seed=args.seed, log=print)
+        np.savez_compressed(args.records, **records)
+        print(f"{len(records['player'])} positions from {args.games} games written to {args.records} "
+              f"in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    if args.command == 'check':
+        failures = check(load_pattern_evaluator(args.weights))
+        print(f"{failures} of 200 positions score differently across their 8 images")
+        return 1 if failures else 0
+
+    with np.load(args.records) as data:
+        records = {key: data[key] for key in data.files}
+    weights = fit(records, args.epochs, seed=args.seed, log=print)
+    np.savez_compressed(args.weights, **{key: value.astype(np.float32) for key, value in weights.items()})
+    print(f"weights written to {args.weights} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
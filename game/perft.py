@@ -0,0 +1,91 @@
+"""
+Perft for game.board.Board: counts the leaf nodes of the full move tree to a fixed depth.
+
+A pass counts as a ply and a finished game is a leaf at whatever depth it ends. The
+counts below are the regression gate for the move generator: any rewrite of
+valid_moves_mask / get_flips / make_move must reproduce them exactly.
+
+Usage:
+    python -m game.perft                 # start position to depth 7 + stored positions
+    python -m game.perft --depth 9       # deeper start-position run
+"""
+import argparse
+import sys
+import time
+
+from game.board import Board, popcount
+
+# Leaf counts from the initial position (black to move), depth 1..9.
+START_COUNTS = [4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288]
+
+# (black bitboard, red bitboard, side to move, leaf counts for depth 1..4)
+STORED_POSITIONS = [
+    (0x04047C0000280000, 0x0000001C3C000000, 1, [7, 87, 680, 8447]),
+    (0x020C000888440200, 0x4030BA5436180C00, 1, [16, 162, 2395, 25494]),
+    (0x08180808289A3C60, 0x004077F65664C080, 1, [13, 175, 2037, 25889]),
+    (0x00782048983160C0, 0x7F061F37668E1F38, 1, [9, 69, 534, 3054]),
+]
+
+
+def perft(board, player, depth):
+    """Number of leaf nodes `depth` plies below board with player to move."""
+    moves = board.valid_moves_mask(player)
+    if depth == 1:
+        if moves:
+            return popcount(moves)
+        return 1  # a pass, or the game is over
+    if not moves:
+        if not board.valid_moves_mask(-player):
+            return 1
+        return perft(board, -player, depth - 1)
+    nodes = 0
+    while moves:
+        low = moves & -moves
+        moves ^= low
+        row, col = divmod(low.bit_length() - 1, 8)
+        undo = board.make_move(player, row, col)
+        nodes += perft(board, -player, depth - 1)
+        board.unmake_move(undo)
+    return nodes
+
+
+def _run(label, board, player, depth, expected):
+    start = time.perf_counter()
+    nodes = perft(board, player, depth)
+    elapsed = time.perf_counter() - start
+    ok = expected is None or nodes == expected
+    status = "" if expected is None else ("ok" if ok else f"MISMATCH (expected {expected})")
+    nps = nodes / elapsed if elapsed > 0 else float("inf")
+    print(f"{label:<12} depth {depth:>2}  {nodes:>12,} nodes  {elapsed:8.3f}s  {nps:12,.0f} nps  {status}")
+    return ok, nodes, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft benchmark and move-generation check for game.board.Board.")
+    parser.add_argument('--depth', type=int, default=7, help='Start-position depth (default: 7)')
+    parser.add_argument('--no-positions', action='store_true', help='Skip the stored midgame positions')
+    args = parser.parse_args(argv)
+
+    all_ok = True
+    total_nodes, total_time = 0, 0.0
+    for depth in range(1, args.depth + 1):
+        expected = START_COUNTS[depth - 1] if depth <= len(START_COUNTS) else None
+        ok, nodes, elapsed = _run("start", Board(), 1, depth, expected)
+        all_ok &= ok
+        total_nodes += nodes
+        total_time += elapsed
+    if not args.no_positions:
+        for i, (black, red, player, counts) in enumerate(STORED_POSITIONS):
+            for depth, expected in enumerate(counts, start=1):
+                ok, nodes, elapsed = _run(f"position {i}", Board.from_bits(black, red, player), player, depth, expected)
+                all_ok &= ok
+                total_nodes += nodes
+                total_time += elapsed
+    print(f"total {total_nodes:,} nodes in {total_time:.3f}s ({total_nodes / max(total_time, 1e-9):,.0f} nps)")
+    if not all_ok:
+        print("perft mismatch: move generation differs from the reference counts")
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
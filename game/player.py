@@ -1,4 +1,17 @@
 import random
+import threading
+import time
+
+from game.board import popcount
+from game.endgame import ENDGAME_EMPTIES, EndgameSolver
+from game.evaluation import MobilityEvaluator, disc_difference, edge_control
+from game.mcts import MCTS
+from game.patterns import WEIGHTS_PATH, load_pattern_evaluator
+from game.probcut import load_probcut
+from game.search import AlphaBeta, SearchStats, SearchTimeout, TranspositionTable
+
+# A ponder search gives up on its own after this many seconds without a reply.
+PONDER_SECONDS = 60
 
 class Player:
     def __init__(self, color):
@@ -18,59 +31,181 @@ class GreedyGreta(Player):
         moves = board_obj.get_valid_moves(self.color)
         return moves[0] if moves else None
 
-class MinimaxMax(Player):
-    """Looks ahead a few moves, tries to maximize own pieces."""
-    def __init__(self, color, depths):
+class SearchPlayer(Player):
+    """Base for the lookahead players: alpha-beta search with `evaluate`.
+
+    Searches to a fixed depth, or with time_budget (seconds) deepens iteratively until
+    the budget is spent; last_depth is the depth the latest move was searched to and
+    last_stats its SearchStats (nodes, NPS, cutoffs, TT hits, wall time).
+    workers > 1 splits the root moves of deep searches across that many processes.
+    Non-zero mobility_weight / frontier_weight add those features to `evaluate`.
+    selective=True searches deeper but no longer exactly: PVS, aspiration windows and
+    Multi-ProbCut with the parameters fitted for `evaluate` (python -m game.probcut).
+    With endgame_empties or fewer empty squares left the game is solved to the end
+    instead (game/endgame.py), for the best final disc difference or, with
+    endgame_exact=False, just for a win. With an OpeningBook as `book`, positions in
+    the book are played from it without searching (drawn by weight with book_sample=True).
+    The transposition table lives as long as the player, so later moves of the same
+    game reuse what earlier searches found.
+
+    With ponder=True the player keeps searching in a background thread after it
+    moves: every opponent reply (the expected one first) is searched to the player's
+    depth, deeper and deeper, into the shared table. The next get_move stops that
+    search and answers straight from it if the actual reply was already done.
+    """
+    def __init__(self, color, depths, evaluate, tt_size_mb=16, time_budget=None, workers=1,
+                 mobility_weight=0, frontier_weight=0, ponder=False, selective=False,
+                 endgame_empties=ENDGAME_EMPTIES, endgame_exact=True, book=None, book_sample=False):
         super().__init__(color)
         index = 0 if color == 1 else 1
         self.depth = depths[index]
+        if mobility_weight or frontier_weight:
+            evaluate = MobilityEvaluator(evaluate, mobility_weight, frontier_weight)
+        self.time_budget = time_budget
+        self.last_depth = None
+        self.last_stats = None
+        self.tt = TranspositionTable(tt_size_mb)
+        probcut = load_probcut(evaluate) if selective else None
+        self.search = AlphaBeta(evaluate, self.tt, workers, selective, probcut)
+        self.book = book
+        self.book_sample = book_sample
+        self.endgame_empties = endgame_empties
+        self.endgame_exact = endgame_exact
+        self.solver = EndgameSolver()
+        self.ponder = ponder
+        self.ponder_hits = 0  # moves answered from a finished ponder search
+        self._ponder_search = AlphaBeta(evaluate, self.tt, selective=selective, probcut=probcut)
+        self._ponder_thread = None
+        self._pondered = {}  # zobrist key -> (depth, move) of finished ponder searches
+
+    def _search_board(self, board_obj):
+        # one scratch board for the whole search, moves are made and unmade on it;
+        # the side to move is part of the zobrist key the table is indexed by
+        board = board_obj.copy()
+        if board.side_to_move != self.color:
+            board.pass_turn()
+        return board
 
     def get_move(self, board_obj):
-        def minimax(board, player, depth):
-            if depth == 0 or not board.has_valid_move(player):
-                black, red = board.count_pieces()
-                return (black - red) * player, None
-            best_score = float('-inf')
-            best_move = None
-            for move in board.get_valid_moves(player):
-                new_board = board.copy()
-                new_board.apply_move(player, *move)
-                score, _ = minimax(new_board, -player, depth - 1)
-                score = -score
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-            return best_score, best_move
-        _, move = minimax(board_obj, self.color, self.depth)
+        self.stop_pondering()
+        if self.book is not None:
+            move = self.book.choose(board_obj, self.color, self.book_sample)
+            if move is not None:
+                self.last_depth = 0
+                self.last_stats = SearchStats()
+                return move
+        board = self._search_board(board_obj)
+        pondered_depth, pondered_move = self._pondered.get(board.zobrist, (0, None))
+        self._pondered = {}
+        empties = 64 - popcount(board.black | board.red)
+        if empties <= self.endgame_empties:
+            start = time.perf_counter()
+            _, move = self.solver.solve(board, self.color, self.endgame_exact)
+            self.last_depth = empties
+            self.last_stats = SearchStats(self.solver.nodes, depth=empties, wall_time=time.perf_counter() - start)
+            return move
+        if not self.time_budget and pondered_depth >= self.depth:
+            # answered from the ponder search: nothing was searched for this move
+            self.ponder_hits += 1
+            move, self.last_depth = pondered_move, pondered_depth
+            self.last_stats = SearchStats(depth=pondered_depth)
+        elif self.time_budget:
+            _, move, self.last_depth = self.search.iterative_deepening(board, self.color, self.time_budget)
+            self.last_stats = self.search.last_stats
+            if pondered_depth > self.last_depth:
+                # the timed search ran, but the move and depth come from the ponder search
+                self.ponder_hits += 1
+                move, self.last_depth = pondered_move, pondered_depth
+                stats = self.last_stats
+                self.last_stats = SearchStats(stats.nodes, stats.leaf_evals, stats.tt_hits, stats.cutoffs,
+                                              stats.expanded, pondered_depth, stats.wall_time)
+        else:
+            _, move = self.search.search(board, self.color, self.depth)
+            self.last_depth = self.depth
+            self.last_stats = self.search.last_stats
+        # no pondering once the next move will be solved anyway
+        if self.ponder and move is not None and empties - 2 > self.endgame_empties:
+            board = board_obj.copy()
+            board.apply_move(self.color, *move)
+            self.start_pondering(board)
         return move
-    
-class EdgesEdgar(Player):
+
+    def start_pondering(self, board):
+        """Search the position after each opponent reply to `board` in the background."""
+        self.stop_pondering()
+        stop = threading.Event()
+        self._ponder_search.stop = stop
+        self._ponder_thread = threading.Thread(target=self._ponder, args=(board, stop), daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the background search, if any, and wait for it to finish."""
+        thread = self._ponder_thread
+        if thread is not None:
+            self._ponder_search.stop.set()
+            thread.join()
+            self._ponder_thread = None
+
+    def _ponder(self, board, stop):
+        timer = threading.Timer(PONDER_SECONDS, stop.set)
+        timer.daemon = True
+        timer.start()
+        opponent = -self.color
+        replies = board.get_valid_moves(opponent)
+        # the reply our own search expected goes first
+        entry = self.tt.probe(board.zobrist)
+        if entry is not None and entry[3] is not None and divmod(entry[3], 8) in replies:
+            replies.remove(divmod(entry[3], 8))
+            replies.insert(0, divmod(entry[3], 8))
+        positions = []
+        for row, col in replies:
+            after = board.copy()
+            after.apply_move(opponent, row, col)
+            if after.has_valid_move(self.color):
+                positions.append(after)
+        max_depth = self.depth if not self.time_budget else 64 - popcount(board.black | board.red)
+        try:
+            for depth in range(1, max_depth + 1):
+                for after in positions:
+                    _, move = self._ponder_search.search(after, self.color, depth)
+                    self._pondered[after.zobrist] = (depth, move)
+        except SearchTimeout:
+            pass
+        finally:
+            timer.cancel()
+
+class MinimaxMax(SearchPlayer):
+    """Looks ahead a few moves, tries to maximize own pieces."""
+    def __init__(self, color, depths, **options):
+        super().__init__(color, depths, disc_difference(), **options)
+
+class EdgesEdgar(SearchPlayer):
     """Looks ahead a few moves, tries to maximize own pieces/specializes in edge control."""
-    def __init__(self, color, depths, edge_value, border_value):
-        super().__init__(color)
+    def __init__(self, color, depths, edge_value, border_value, **options):
         index = 0 if color == 1 else 1
-        self.depth = depths[index]
         self.edge_value = edge_value[index]
         self.border_value = border_value[index]
+        super().__init__(color, depths, edge_control(self.edge_value, self.border_value), **options)
+
+class PatternPete(SearchPlayer):
+    """Looks ahead a few moves, scoring positions with pattern tables fitted to game records (game/patterns.py)."""
+    def __init__(self, color, depths, weights=WEIGHTS_PATH, **options):
+        super().__init__(color, depths, load_pattern_evaluator(weights), **options)
+
+class MonteCarloMonty(Player):
+    """Plays out random games from the most promising lines (MCTS) and picks the most tried move.
+
+    Runs `iterations` playouts per move, or as many as fit in time_budget seconds;
+    batch_size playouts are played together on a BatchBoard.
+    """
+    def __init__(self, color, iterations=2000, time_budget=None, batch_size=128, exploration=1.4, seed=None):
+        super().__init__(color)
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.mcts = MCTS(exploration, batch_size, seed)
 
     def get_move(self, board_obj):
-        def edgesedgar(board, player, depth, edge_value, border_value):
-            if depth == 0 or not board.has_valid_move(player):
-                black, red = board.count_edges(edge_value, border_value)
-                return (black - red) * player, None
-            best_score = float('-inf')
-            best_move = None
-            for move in board.get_valid_moves(player):
-                new_board = board.copy()
-                new_board.apply_move(player, *move)
-                score, _ = edgesedgar(new_board, -player, depth - 1, edge_value, border_value)
-                score = -score
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-            return best_score, best_move
-        _, move = edgesedgar(board_obj, self.color, self.depth, self.edge_value, self.border_value)
-        return move
+        return self.mcts.search(board_obj, self.color, self.iterations, self.time_budget)
 
 class RLRandomRiley(Player):
     """Placeholder RL agent: picks a random valid move."""
@@ -0,0 +1,198 @@
+"""
+Multi-ProbCut for the selective search in game/search.py, plus the tools to fit it
+and to benchmark selective against exact search.
+
+A node `depth` plies deep is first searched `shallow` plies deep. The deep score is
+modelled as a * shallow score + b with residual spread sigma, fitted per (depth,
+game stage) by regression over positions from random games. Where the shallow
+score says the deep one lies outside the window with confidence t * sigma, the
+node is cut. Parameters depend on the evaluator and are kept per repr(evaluate) in
+probcut_params.json.
+
+Usage:
+    python -m game.probcut fit --evaluator edges          # fit and store parameters
+    python -m game.probcut bench --evaluator edges --time 1.0
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+import numpy as np
+
+from game.board import Board, popcount
+from game.evaluation import disc_difference, edge_control
+from game.patterns import load_pattern_evaluator
+from game.search import AlphaBeta, TranspositionTable
+
+PARAMS_PATH = os.path.join(os.path.dirname(__file__), "probcut_params.json")
+
+# deep depth -> shallow check depth (same parity, odd and even depths score differently)
+CHECK_DEPTHS = {3: 1, 4: 2, 5: 3, 6: 2, 7: 3}
+
+# Confidence in sigmas a shallow result needs before a node is cut.
+PROBCUT_T = 1.5
+
+# Game stages by empty squares: 0-19, 20-39, 40+
+STAGE_EMPTIES = 20
+STAGES = 3
+
+# The evaluators the command line can fit and benchmark (the app's defaults and PatternPete's).
+EVALUATORS = {
+    "disc": disc_difference,
+    "edges": lambda: edge_control(3, 1),
+    "patterns": load_pattern_evaluator,
+}
+
+
+def stage(empties):
+    return min(empties // STAGE_EMPTIES, STAGES - 1)
+
+
+class ProbCut:
+    """Fitted cut parameters: entries are (depth, shallow, stage, a, b, sigma)."""
+
+    def __init__(self, entries, t=PROBCUT_T):
+        self.entries = [tuple(entry) for entry in entries]
+        self.t = t
+        self.table = {
+            (depth, stage_): (shallow, a, b, t * sigma)
+            for depth, shallow, stage_, a, b, sigma in self.entries
+        }
+
+    def check(self, depth, empties):
+        """(shallow depth, a, b, cut margin) for a node, or None where nothing was fitted."""
+        return self.table.get((depth, stage(empties)))
+
+    def __repr__(self):
+        return f"ProbCut({self.entries!r}, t={self.t!r})"
+
+
+def load_probcut(evaluate, path=PARAMS_PATH, t=PROBCUT_T):
+    """The ProbCut stored for evaluate, or None if it was never fitted."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        entries = json.load(f).get(repr(evaluate))
+    return ProbCut(entries, t) if entries else None
+
+
+def save_probcut(evaluate, probcut, path=PARAMS_PATH):
+    params = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            params = json.load(f)
+    params[repr(evaluate)] = [list(entry) for entry in probcut.entries]
+    with open(path, "w") as f:
+        # one evaluator per key, one fitted entry per line
+        f.write("{\n")
+        for i, (key, entries) in enumerate(params.items()):
+            rows = ",\n".join(f"  {json.dumps(entry)}" for entry in entries)
+            f.write(f" {json.dumps(key)}: [\n{rows}\n ]{',' if i < len(params) - 1 else ''}\n")
+        f.write("}\n")
+
+
+def sample_positions(count, seed=0):
+    """(board, player) pairs from random games, one per game at a random ply, side to move set."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, player = Board(), 1
+        for _ in range(rng.randrange(2, 55)):
+            moves = board.get_valid_moves(player)
+            if not moves:
+                player = -player
+                moves = board.get_valid_moves(player)
+                if not moves:
+                    break
+            board.apply_move(player, *rng.choice(moves))
+            player = -player
+        if board.has_valid_move(player):
+            if board.side_to_move != player:
+                board.pass_turn()
+            positions.append((board, player))
+    return positions
+
+
+def fit(evaluate, positions, check_depths=CHECK_DEPTHS, t=PROBCUT_T, log=None):
+    """Fit a ProbCut for evaluate from exact searches of positions at every depth pair."""
+    searcher = AlphaBeta(evaluate, TranspositionTable(16))
+    depths = sorted(set(check_depths) | set(check_depths.values()))
+    samples = {}  # (depth, stage) -> [(shallow score, deep score)]
+    for i, (board, player) in enumerate(positions):
+        empties = 64 - popcount(board.black | board.red)
+        scores = {depth: searcher.search(board.copy(), player, depth)[0] for depth in depths if depth <= empties}
+        for depth, shallow in check_depths.items():
+            if depth in scores:
+                samples.setdefault((depth, stage(empties)), []).append((scores[shallow], scores[depth]))
+        if log and (i + 1) % 10 == 0:
+            log(f"{i + 1}/{len(positions)} positions searched")
+    entries = []
+    for (depth, stage_), pairs in sorted(samples.items()):
+        if len(pairs) < 10:
+            continue
+        x, y = np.array(pairs, dtype=np.float64).T
+        a, b = np.polyfit(x, y, 1)
+        if a <= 0:
+            continue
+        sigma = float(np.std(y - (a * x + b)))
+        entries.append((depth, check_depths[depth], stage_, round(float(a), 4), round(float(b), 4), round(sigma, 4)))
+    return ProbCut(entries, t)
+
+
+def bench(evaluate, positions, time_budget, probcut):
+    """Timed exact vs selective search on each position: depth reached, nodes and move agreement."""
+    rows = []
+    for board, player in positions:
+        result = {}
+        for name, searcher in (
+            ("exact", AlphaBeta(evaluate, TranspositionTable(16))),
+            ("selective", AlphaBeta(evaluate, TranspositionTable(16), selective=True, probcut=probcut)),
+        ):
+            _, move, depth = searcher.iterative_deepening(board.copy(), player, time_budget)
+            result[name] = (move, depth, searcher.last_stats)
+        rows.append(result)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit Multi-ProbCut parameters or benchmark selective search.")
+    parser.add_argument('command', choices=['fit', 'bench'])
+    parser.add_argument('--evaluator', choices=sorted(EVALUATORS), default='edges', help='Evaluator (default: edges)')
+    parser.add_argument('--positions', type=int, help='Positions to use (default: 150 to fit, 20 to bench)')
+    parser.add_argument('--seed', type=int, help='Random seed for the positions (default: 0 to fit, 1 to bench)')
+    parser.add_argument('--t', type=float, default=PROBCUT_T, help=f'Cut confidence in sigmas (default: {PROBCUT_T})')
+    parser.add_argument('--time', type=float, default=1.0, help='Seconds per move for bench (default: 1.0)')
+    parser.add_argument('--params', default=PARAMS_PATH, help='Parameter file')
+    args = parser.parse_args(argv)
+    evaluate = EVALUATORS[args.evaluator]()
+
+    if args.command == 'fit':
+        positions = sample_positions(args.positions or 150, 0 if args.seed is None else args.seed)
+        probcut = fit(evaluate, positions, t=args.t, log=print)
+        for depth, shallow, stage_, a, b, sigma in probcut.entries:
+            print(f"depth {depth} <- {shallow}  stage {stage_}:  deep = {a:.3f} * shallow + {b:+.3f}  sigma {sigma:.3f}")
+        save_probcut(evaluate, probcut, args.params)
+        print(f"saved to {args.params}")
+        return 0
+
+    probcut = load_probcut(evaluate, args.params, args.t)
+    if probcut is None:
+        print(f"no ProbCut parameters for {args.evaluator}, benchmarking PVS and aspiration windows only")
+    positions = sample_positions(args.positions or 20, 1 if args.seed is None else args.seed)
+    rows = bench(evaluate, positions, args.time, probcut)
+    print(f"{'':>4} {'exact depth':>11} {'nodes':>10} {'selective depth':>15} {'nodes':>10}  same move")
+    for i, row in enumerate(rows):
+        (exact_move, exact_depth, exact_stats), (move, depth, stats) = row["exact"], row["selective"]
+        print(f"{i:>4} {exact_depth:>11} {exact_stats.nodes:>10,} {depth:>15} {stats.nodes:>10,}  {move == exact_move}")
+    exact_depths = [row["exact"][1] for row in rows]
+    depths = [row["selective"][1] for row in rows]
+    same = sum(row["exact"][0] == row["selective"][0] for row in rows)
+    print(f"mean depth at {args.time}s: exact {np.mean(exact_depths):.2f}, selective {np.mean(depths):.2f}; "
+          f"same move in {same}/{len(rows)} positions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
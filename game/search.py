@@ -0,0 +1,530 @@
+"""
+Alpha-beta negamax shared by the minimax-family players in game/player.py.
+
+The search makes and unmakes moves on a single Board. Scores are from the point of
+view of the side to move, and a side without legal moves is scored statically, the
+same rule the original exhaustive minimax used, so the search returns the same value
+and the same best move (ties go to the first move in row-major order), only faster.
+
+The selective mode gives that guarantee up for depth: principal variation search,
+aspiration windows around the previous iteration's score and Multi-ProbCut
+(game/probcut.py) cutting subtrees a shallow search says are out of the window.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from game.board import Board, CORNER_MASK, flips_mask, legal_moves_mask, popcount
+
+INF = float('inf')
+
+# Root moves that come before the current best in row-major order are searched with a
+# window this far below the best score, so an exact tie is still detected.
+TIE_EPSILON = 1e-9
+
+# How many nodes pass between two looks at the clock in a timed search.
+CLOCK_CHECK_NODES = 1024
+
+# Parallel search only splits the root when at least this deep; shallower searches
+# finish faster than the inter-process round trip.
+PARALLEL_MIN_DEPTH = 4
+
+# Nodes with at least this much depth left order their moves by opponent mobility.
+MOBILITY_ORDER_DEPTH = 2
+
+# Width of the null windows of principal variation search; scores closer together
+# than this count as equal.
+NULL_WINDOW = TIE_EPSILON
+
+# Selective iterative deepening searches each depth from this one on inside a window
+# of +-aspiration around the previous depth's score first.
+ASPIRATION_MIN_DEPTH = 3
+
+X_SQUARE_MASK = (1 << 9) | (1 << 14) | (1 << 49) | (1 << 54)
+C_SQUARE_MASK = ((1 << 1) | (1 << 8) | (1 << 6) | (1 << 15)
+                 | (1 << 48) | (1 << 57) | (1 << 55) | (1 << 62))
+
+# Static ordering class per square: corners first, X-squares (diagonal to a corner) last.
+SQUARE_CLASS = [
+    0 if CORNER_MASK >> sq & 1 else 3 if X_SQUARE_MASK >> sq & 1 else 2 if C_SQUARE_MASK >> sq & 1 else 1
+    for sq in range(64)
+]
+
+
+# Transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by Board.zobrist.
+
+    Every bucket has a depth-preferred slot, which keeps the deepest result unless it
+    is from an earlier search, and an always-replace slot for everything else.
+    Entries are (key, depth, bound, score, move, generation) tuples.
+    """
+
+    ENTRY_BYTES = 160  # rough size of one stored tuple with its ints
+
+    def __init__(self, size_mb=16):
+        buckets = 1
+        while buckets * 4 * self.ENTRY_BYTES <= size_mb * 2 ** 20:
+            buckets *= 2
+        self.size_mb = size_mb
+        self.mask = buckets - 1
+        self.slots = [None] * (2 * buckets)
+        self.generation = 0
+        self.hits = 0
+
+    def new_search(self):
+        # entries from earlier searches stay usable but no longer block replacement
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+
+    def probe(self, key):
+        """(depth, bound, score, move) stored for key, or None."""
+        i = (key & self.mask) << 1
+        slots = self.slots
+        entry = slots[i]
+        if entry is None or entry[0] != key:
+            entry = slots[i + 1]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry[1:5]
+
+    def store(self, key, depth, bound, score, move):
+        i = (key & self.mask) << 1
+        slots = self.slots
+        entry = (key, depth, bound, score, move, self.generation)
+        preferred = slots[i]
+        if preferred is None or preferred[0] == key or depth >= preferred[1] or preferred[5] != self.generation:
+            slots[i] = entry
+        else:
+            slots[i + 1] = entry
+
+
+class SearchTimeout(Exception):
+    """Raised inside a timed search once its deadline has passed."""
+
+
+class SearchStats:
+    """What one search did: node and leaf counts, transposition table hits, beta
+    cutoffs, the depth it finished and how long it took.
+
+    nodes counts every position searched below the root, expanded the ones (root
+    included) whose moves were generated, so nodes / expanded is the effective
+    branching factor. Counts from parallel workers are added in.
+    """
+
+    def __init__(self, nodes=0, leaf_evals=0, tt_hits=0, cutoffs=0, expanded=0, depth=0, wall_time=0.0):
+        self.nodes = nodes
+        self.leaf_evals = leaf_evals
+        self.tt_hits = tt_hits
+        self.cutoffs = cutoffs
+        self.expanded = expanded
+        self.depth = depth
+        self.wall_time = wall_time
+
+    @property
+    def nps(self):
+        return self.nodes / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def branching_factor(self):
+        return self.nodes / self.expanded if self.expanded else 0.0
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'leaf_evals': self.leaf_evals,
+            'nps': self.nps,
+            'branching_factor': self.branching_factor,
+            'tt_hits': self.tt_hits,
+            'cutoffs': self.cutoffs,
+            'depth': self.depth,
+            'wall_time': self.wall_time,
+        }
+
+    def __str__(self):
+        return (f"depth {self.depth}: {self.nodes:,} nodes ({self.leaf_evals:,} evals) in "
+                f"{self.wall_time:.3f}s, {self.nps:,.0f} nps, branching {self.branching_factor:.2f}, "
+                f"{self.tt_hits:,} TT hits, {self.cutoffs:,} cutoffs")
+
+
+# --- Parallel root splitting ---
+# Pools stay alive between get_move calls so workers (and their transposition tables)
+# are warm; each pool shares one alpha value with its workers. concurrent.futures
+# shuts them down when the interpreter exits.
+_POOLS = {}
+_WORKER = {}
+
+
+def _init_worker(shared_alpha):
+    _WORKER['alpha'] = shared_alpha
+    _WORKER['searchers'] = {}
+
+
+def get_pool(workers):
+    """(ProcessPoolExecutor, shared alpha) for `workers` processes, created on first use."""
+    if workers not in _POOLS:
+        shared_alpha = multiprocessing.Value('d', -INF)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared_alpha,))
+        _POOLS[workers] = (pool, shared_alpha)
+    return _POOLS[workers]
+
+
+def _search_root_move(evaluate, black, red, player, sq, depth, deadline, tt_size_mb, probcut=None):
+    # Runs in a worker: exact score of root move sq if it can reach the shared alpha,
+    # otherwise an upper bound below it. None if the time ran out. deadline is a
+    # time.time() value (or None), so a task that waited in the queue does not get
+    # a fresh budget when it starts. The worker's
+    # counters come back with it for the caller's stats. A probcut (or False for
+    # selective search without one) makes the worker search selectively too.
+    searchers = _WORKER['searchers']
+    key = (repr(evaluate), repr(probcut))
+    if key not in searchers:
+        searchers[key] = AlphaBeta(evaluate, TranspositionTable(tt_size_mb),
+                                   selective=probcut is not None, probcut=probcut or None)
+    searcher = searchers[key]
+    searcher.tt.new_search()
+    searcher._reset_counters()
+    searcher.deadline = None if deadline is None else time.perf_counter() + (deadline - time.time())
+    shared_alpha = _WORKER['alpha']
+    alpha = shared_alpha.value - TIE_EPSILON
+    board = Board.from_bits(black, red, player)
+    board.make_move(player, sq >> 3, sq & 7)
+    try:
+        score = -searcher._child_search(board, -player, depth - 1, -INF, -alpha)
+    except SearchTimeout:
+        score = None
+    finally:
+        searcher.deadline = None
+    if score is not None:
+        with shared_alpha.get_lock():
+            if score > shared_alpha.value:
+                shared_alpha.value = score
+    return sq, score, searcher._counters()
+
+
+class AlphaBeta:
+    """Fail-soft alpha-beta negamax with move ordering.
+
+    evaluate(board, player) scores a position for `player` (see game/evaluation.py;
+    it must be picklable for parallel search). With a TranspositionTable,
+    results are stored under the board's zobrist key (which includes the side to move,
+    so the board must have `player` to move when search() is called).
+    last_stats is the SearchStats of the latest search() or iterative_deepening().
+
+    selective=True trades exactness for depth (see the module docstring): probcut is a
+    game.probcut.ProbCut fitted for this evaluator (None searches without it) and
+    aspiration the half-width of the first window tried at each depth.
+    """
+
+    def __init__(self, evaluate, tt=None, workers=1, selective=False, probcut=None, aspiration=4):
+        self.evaluate = evaluate
+        self.tt = tt
+        self.workers = workers  # > 1 splits the root moves of deep searches over a process pool
+        self.selective = selective
+        self.probcut = probcut
+        self.aspiration = aspiration
+        self._child_search = self._pvs if selective else self._negamax
+        self.killers = {}  # remaining depth -> square that last caused a cutoff there
+        self.deadline = None  # time.perf_counter() value at which a timed search gives up
+        self.stop = None  # threading.Event; once set, a running search gives up as if out of time
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs = 0
+        self.expanded = 0
+        self.tt_hits = 0  # table hits at the start of the search, or counted by workers
+        self.last_stats = None
+
+    def _reset_counters(self):
+        self.nodes = self.leaf_evals = self.cutoffs = self.expanded = 0
+        self.tt_hits = 0 if self.tt is None else -self.tt.hits
+
+    def _counters(self):
+        tt_hits = self.tt_hits + (0 if self.tt is None else self.tt.hits)
+        return self.nodes, self.leaf_evals, tt_hits, self.cutoffs, self.expanded
+
+    def _finish_stats(self, depth, start):
+        self.last_stats = SearchStats(*self._counters(), depth=depth, wall_time=time.perf_counter() - start)
+
+    def search(self, board, player, depth):
+        """(score, move) of the best move for player searched to depth; move is None without legal moves."""
+        start = time.perf_counter()
+        if self.tt is not None:
+            self.tt.new_search()
+        self._reset_counters()
+        self.deadline = None
+        if self.selective:
+            # shallower iterations fill the table and give the aspiration windows their centre
+            result = self._root(board, player, 1)
+            for d in range(2, depth + 1):
+                result = self._aspiration_root(board, player, d, result[0])
+        else:
+            result = self._root(board, player, depth)
+        self._finish_stats(depth, start)
+        return result
+
+    def iterative_deepening(self, board, player, time_budget, max_depth=64):
+        """Search depth 1, 2, ... until time_budget seconds have passed.
+
+        Returns (score, move, depth) from the deepest iteration that completed. Depth 1
+        always completes. A search cut off by the clock leaves `board` mid-line, so pass
+        a scratch copy.
+        """
+        start = time.perf_counter()
+        if self.tt is not None:
+            self.tt.new_search()
+        self._reset_counters()
+        empties = 64 - popcount(board.black | board.red)
+        max_depth = max(1, min(max_depth, empties))
+        self.deadline = None
+        score, move = self._root(board, player, 1)
+        completed = 1
+        self.deadline = time.perf_counter() + time_budget
+        try:
+            for depth in range(2, max_depth + 1):
+                if self.selective:
+                    score, move = self._aspiration_root(board, player, depth, score)
+                else:
+                    score, move = self._root(board, player, depth)
+                completed = depth
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        self._finish_stats(completed, start)
+        return score, move, completed
+
+    def _aspiration_root(self, board, player, depth, guess):
+        # a window around the last score first; the full window if the score falls outside
+        if depth >= ASPIRATION_MIN_DEPTH and abs(guess) != INF:
+            alpha, beta = guess - self.aspiration, guess + self.aspiration
+            score, move = self._root(board, player, depth, alpha, beta)
+            if alpha < score < beta:
+                return score, move
+        return self._root(board, player, depth)
+
+    def _root(self, board, player, depth, alpha=-INF, beta=INF):
+        moves = board.valid_moves_mask(player)
+        if depth == 0 or not moves:
+            self.leaf_evals += 1
+            return self.evaluate(board, player), None
+        self.expanded += 1
+        tt = self.tt
+        hint = None
+        if tt is not None:
+            entry = tt.probe(board.zobrist)
+            if entry is not None:
+                hint = entry[3]
+        ordered = self._ordered_moves(board, player, moves, depth, hint)
+        full_window = alpha == -INF and beta == INF
+        if self.workers > 1 and depth >= PARALLEL_MIN_DEPTH and len(ordered) > 1 and full_window:
+            best_score, best_sq = self._parallel_root(board, player, depth, ordered)
+            if tt is not None:
+                tt.store(board.zobrist, depth, EXACT, best_score, best_sq)
+            return best_score, divmod(best_sq, 8)
+        best_score, best_sq = -INF, None
+        for _, sq, flips in ordered:
+            if best_sq is None:
+                move_alpha = alpha
+            elif sq < best_sq:
+                move_alpha = max(alpha, best_score - TIE_EPSILON)
+            else:
+                move_alpha = max(alpha, best_score)
+            undo = board.make_move(player, sq >> 3, sq & 7, flips)
+            score = -self._child_search(board, -player, depth - 1, -beta, -move_alpha)
+            board.unmake_move(undo)
+            if score > best_score or (score == best_score and sq < best_sq):
+                best_score, best_sq = score, sq
+                if best_score >= beta:
+                    break
+        if tt is not None:
+            bound = EXACT if full_window else UPPER if best_score <= alpha else LOWER if best_score >= beta else EXACT
+            tt.store(board.zobrist, depth, bound, best_score, best_sq)
+        return best_score, divmod(best_sq, 8)
+
+    def _parallel_root(self, board, player, depth, ordered):
+        # Young brothers wait: the first (best-ordered) move is searched here to get an
+        # alpha, then the remaining moves go to the pool and share the best score so far.
+        _, sq, flips = ordered[0]
+        undo = board.make_move(player, sq >> 3, sq & 7, flips)
+        best_score = -self._child_search(board, -player, depth - 1, -INF, INF)
+        board.unmake_move(undo)
+        best_sq = sq
+
+        # no task of an earlier search is left (see below), so nothing else writes the alpha
+        pool, shared_alpha = get_pool(self.workers)
+        shared_alpha.value = best_score
+        deadline = None if self.deadline is None else time.time() + (self.deadline - time.perf_counter())
+        tt_size_mb = 16 if self.tt is None else self.tt.size_mb
+        probcut = (self.probcut or False) if self.selective else None
+        futures = [
+            pool.submit(_search_root_move, self.evaluate, board.black, board.red, player, sq, depth, deadline,
+                        tt_size_mb, probcut)
+            for _, sq, _ in ordered[1:]
+        ]
+        timed_out = False
+        try:
+            for future in futures:
+                if future.cancelled():
+                    continue
+                sq, score, counters = future.result()
+                self.nodes += counters[0]
+                self.leaf_evals += counters[1]
+                self.tt_hits += counters[2]
+                self.cutoffs += counters[3]
+                self.expanded += counters[4]
+                if score is None:
+                    timed_out = True
+                    for pending in futures:
+                        pending.cancel()
+                elif not timed_out and (score > best_score or (score == best_score and sq < best_sq)):
+                    best_score, best_sq = score, sq
+        finally:
+            # tasks still running would go on writing the pool's shared alpha into the
+            # next search, so they are waited for before this one returns or gives up
+            for pending in futures:
+                pending.cancel()
+            wait(futures)
+        if timed_out:
+            raise SearchTimeout
+        return best_score, best_sq
+
+    def _negamax(self, board, player, depth, alpha, beta):
+        self.nodes += 1
+        if not self.nodes % CLOCK_CHECK_NODES and (
+            (self.deadline is not None and time.perf_counter() > self.deadline)
+            or (self.stop is not None and self.stop.is_set())
+        ):
+            raise SearchTimeout
+        if depth == 0:
+            self.leaf_evals += 1
+            return self.evaluate(board, player)
+        tt = self.tt
+        hint = None
+        if tt is not None:
+            key = board.zobrist
+            entry = tt.probe(key)
+            if entry is not None:
+                entry_depth, bound, score, hint = entry
+                if entry_depth >= depth and (
+                    bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha)
+                ):
+                    return score
+        moves = board.valid_moves_mask(player)
+        if not moves:
+            self.leaf_evals += 1
+            return self.evaluate(board, player)
+        self.expanded += 1
+        alpha_orig = alpha
+        best, best_sq = -INF, None
+        for _, sq, flips in self._ordered_moves(board, player, moves, depth, hint):
+            undo = board.make_move(player, sq >> 3, sq & 7, flips)
+            score = -self._negamax(board, -player, depth - 1, -beta, -alpha)
+            board.unmake_move(undo)
+            if score > best:
+                best, best_sq = score, sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.killers[depth] = sq
+                        self.cutoffs += 1
+                        break
+        if tt is not None:
+            bound = UPPER if best <= alpha_orig else LOWER if best >= beta else EXACT
+            tt.store(key, depth, bound, best, best_sq)
+        return best
+
+    def _pvs(self, board, player, depth, alpha, beta):
+        # _negamax for the selective mode: ProbCut first, then the first move with the
+        # full window and the rest with null windows, re-searched when they beat alpha
+        self.nodes += 1
+        if not self.nodes % CLOCK_CHECK_NODES and (
+            (self.deadline is not None and time.perf_counter() > self.deadline)
+            or (self.stop is not None and self.stop.is_set())
+        ):
+            raise SearchTimeout
+        if depth == 0:
+            self.leaf_evals += 1
+            return self.evaluate(board, player)
+        tt = self.tt
+        hint = None
+        if tt is not None:
+            key = board.zobrist
+            entry = tt.probe(key)
+            if entry is not None:
+                entry_depth, bound, score, hint = entry
+                if entry_depth >= depth and (
+                    bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha)
+                ):
+                    return score
+        moves = board.valid_moves_mask(player)
+        if not moves:
+            self.leaf_evals += 1
+            return self.evaluate(board, player)
+        if self.probcut is not None:
+            check = self.probcut.check(depth, 64 - popcount(board.black | board.red))
+            if check is not None:
+                # the deep score is predicted as a * shallow + b, off by up to margin
+                shallow, a, b, margin = check
+                if beta != INF:
+                    bound = (beta + margin - b) / a
+                    if self._pvs(board, player, shallow, bound - NULL_WINDOW, bound) >= bound:
+                        self.cutoffs += 1
+                        return beta
+                if alpha != -INF:
+                    bound = (alpha - margin - b) / a
+                    if self._pvs(board, player, shallow, bound, bound + NULL_WINDOW) <= bound:
+                        return alpha
+        self.expanded += 1
+        alpha_orig = alpha
+        best, best_sq = -INF, None
+        for _, sq, flips in self._ordered_moves(board, player, moves, depth, hint):
+            undo = board.make_move(player, sq >> 3, sq & 7, flips)
+            if best_sq is None:
+                score = -self._pvs(board, -player, depth - 1, -beta, -alpha)
+            else:
+                score = -self._pvs(board, -player, depth - 1, -alpha - NULL_WINDOW, -alpha)
+                if alpha < score < beta:
+                    score = -self._pvs(board, -player, depth - 1, -beta, -alpha)
+            board.unmake_move(undo)
+            if score > best:
+                best, best_sq = score, sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.killers[depth] = sq
+                        self.cutoffs += 1
+                        break
+        if tt is not None:
+            bound = UPPER if best <= alpha_orig else LOWER if best >= beta else EXACT
+            tt.store(key, depth, bound, best, best_sq)
+        return best
+
+    def _ordered_moves(self, board, player, moves, depth, hint=None):
+        # (sort key, square, flips) for every legal move: hint first, then corners,
+        # the killer move, and the rest by how few replies they leave the opponent.
+        own, opp = (board.black, board.red) if player == 1 else (board.red, board.black)
+        killer = self.killers.get(depth)
+        by_mobility = depth >= MOBILITY_ORDER_DEPTH
+        ordered = []
+        while moves:
+            low = moves & -moves
+            moves ^= low
+            sq = low.bit_length() - 1
+            flips = flips_mask(own, opp, sq)
+            if sq == hint:
+                key = -1
+            elif sq == killer and SQUARE_CLASS[sq]:
+                key = 64
+            else:
+                key = SQUARE_CLASS[sq] * 128
+                if by_mobility:
+                    key += popcount(legal_moves_mask(opp ^ flips, own | flips | low))
+            ordered.append((key, sq, flips))
+        ordered.sort()
+        return ordered
@@ -7,9 +7,10 @@ against other agents (including itself) in the game of Othello, using the `Board
 Modules:
 - q_network.py: Defines a small feedforward neural network for estimating Q-values.
 - rl_agent.py: Implements the RLAgent class as a subclass of Player.
+- puct.py: PUCT tree search guided by the Q-network (PUCTAgent), with batched leaf evaluation.
 - train_rl_agent.py: Entry point for training the agent via self-play or vs. scripted opponents.
 - utils.py: Helper functions (e.g., board encoding, action masking).
-- replay_buffer.py (optional): For experience replay if needed.
+- replay_buffer.py: Ring buffer of transitions in preallocated arrays, sampled as batch tensors.
 
 Design:
 The agent observes board states, selects legal actions using an ε-greedy policy, and updates Q-values
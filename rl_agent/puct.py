@@ -0,0 +1,178 @@
+"""
+PUCT search guided by a QNetwork, with batched leaf evaluation.
+
+The network's Q-values of the legal moves give both the priors (a softmax over them)
+and the value of a position (the best of them, clipped to [-1, 1] like the training
+rewards). A round of search walks the tree leaf_batch times with a virtual loss on
+every edge it takes, so the walks end on different leaves. All the new leaves are
+then evaluated in one forward pass, and the values are backed up in place of the
+virtual losses.
+"""
+import math
+import time
+
+import numpy as np
+import torch
+
+from game.batch_board import BatchBoard
+from game.board import bits_to_squares, flips_mask, legal_moves_mask, popcount
+from game.mcts import PASS
+from rl_agent.rl_agent import RLAgent
+
+
+class PUCTNode:
+    """A position with per-move statistics; priors is None until the network has seen it."""
+
+    __slots__ = ("black", "red", "player", "moves", "children", "priors", "visits", "value_sum", "terminal_value")
+
+    def __init__(self, black, red, player):
+        self.black = black
+        self.red = red
+        self.player = player  # side to move
+        own, opp = (black, red) if player == 1 else (red, black)
+        moves = legal_moves_mask(own, opp)
+        self.terminal_value = None
+        if moves:
+            self.moves = [row * 8 + col for row, col in bits_to_squares(moves)]
+        elif legal_moves_mask(opp, own):
+            self.moves = [PASS]
+        else:
+            # game over: the result from the side to move's point of view
+            own_count, opp_count = popcount(own), popcount(opp)
+            self.moves = []
+            self.terminal_value = float((own_count > opp_count) - (own_count < opp_count))
+        self.children = [None] * len(self.moves)
+        self.priors = None
+        self.visits = np.zeros(len(self.moves), dtype=np.int64)
+        self.value_sum = np.zeros(len(self.moves), dtype=np.float64)  # for self.player
+
+    def child(self, i):
+        if self.children[i] is None:
+            black, red, player, sq = self.black, self.red, self.player, self.moves[i]
+            if sq != PASS:
+                own, opp = (black, red) if player == 1 else (red, black)
+                flips = flips_mask(own, opp, sq)
+                own |= flips | (1 << sq)
+                opp ^= flips
+                black, red = (own, opp) if player == 1 else (opp, own)
+            self.children[i] = PUCTNode(black, red, -player)
+        return self.children[i]
+
+
+class PUCT:
+    """PUCT search (see the module docstring) with `model`, a QNetwork.
+
+    c_puct weighs the priors against the search results, temperature sharpens
+    (below 1) or flattens the softmax that turns Q-values into priors.
+    """
+
+    def __init__(self, model, device=None, leaf_batch=32, c_puct=1.5, temperature=0.25, virtual_loss=1.0):
+        self.model = model
+        self.device = device or torch.device("cpu")
+        self.leaf_batch = leaf_batch
+        self.c_puct = c_puct
+        self.temperature = temperature
+        self.virtual_loss = virtual_loss
+        self.root = None
+        self.simulations = 0  # simulations run by the latest search
+        self.evaluations = 0  # positions sent through the network by the latest search
+
+    def search(self, board, player, simulations=400, time_budget=None):
+        """Most visited move for player after `simulations` simulations, or after
+        time_budget seconds if given (at least one round is always run). None without legal moves."""
+        self.root = root = PUCTNode(board.black, board.red, player)
+        self.simulations = self.evaluations = 0
+        if not root.moves or root.moves == [PASS]:
+            return None
+        self._evaluate([root])
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        while True:
+            size = self.leaf_batch if deadline is not None else min(self.leaf_batch, max(1, simulations - self.simulations))
+            self._run_round(root, size)
+            self.simulations += size
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    break
+            elif self.simulations >= simulations:
+                break
+        return divmod(root.moves[int(np.argmax(root.visits))], 8)
+
+    def _select(self, root):
+        # (node, move index) edges from the root to a leaf, virtual loss applied on the way
+        node = root
+        path = []
+        while True:
+            total = node.visits.sum()
+            q = np.where(node.visits > 0, node.value_sum / np.maximum(node.visits, 1), 0.0)
+            u = self.c_puct * node.priors * math.sqrt(total + 1) / (1 + node.visits)
+            i = int(np.argmax(q + u))
+            node.visits[i] += 1
+            node.value_sum[i] -= self.virtual_loss
+            path.append((node, i))
+            node = node.child(i)
+            if node.priors is None or node.terminal_value is not None:
+                return path, node
+
+    def _run_round(self, root, size):
+        walks = [self._select(root) for _ in range(size)]
+        pending = {}
+        for _, leaf in walks:
+            if leaf.terminal_value is None and leaf.priors is None:
+                pending[id(leaf)] = leaf
+        values = self._evaluate(list(pending.values()))
+        for path, leaf in walks:
+            value = leaf.terminal_value if leaf.terminal_value is not None else values[id(leaf)]
+            # value is for the side to move at the leaf; each edge above belongs to the other side
+            for node, i in reversed(path):
+                value = -value
+                node.value_sum[i] += value + self.virtual_loss
+
+    def _evaluate(self, leaves):
+        """Set priors on the leaves and return their values, keyed by id(), in one forward pass.
+
+        A side that has to pass is valued as minus its opponent's value in the same position.
+        """
+        if not leaves:
+            return {}
+        must_pass = np.array([leaf.moves == [PASS] for leaf in leaves])
+        batch = BatchBoard(0)
+        batch.black = np.array([leaf.black for leaf in leaves], dtype=np.uint64)
+        batch.red = np.array([leaf.red for leaf in leaves], dtype=np.uint64)
+        batch.side_to_move = np.array([leaf.player for leaf in leaves], dtype=np.int8)
+        color = np.where(must_pass, -batch.side_to_move, batch.side_to_move)
+        legal = batch.valid_moves(color)
+        planes = torch.from_numpy(batch.to_planes(color)).to(self.device)
+        with torch.no_grad():
+            q_values = self.model(planes).cpu().numpy().astype(np.float64)
+        self.evaluations += len(leaves)
+        values = {}
+        for leaf, q, ok, passing in zip(leaves, q_values, legal, must_pass):
+            value = float(np.clip(q[ok].max(), -1.0, 1.0))
+            if passing:
+                leaf.priors = np.ones(1)
+                value = -value
+            else:
+                logits = q[leaf.moves] / self.temperature
+                priors = np.exp(logits - logits.max())
+                leaf.priors = priors / priors.sum()
+            values[id(leaf)] = value
+        return values
+
+
+class PUCTAgent(RLAgent):
+    """An RLAgent that picks its moves with a PUCT search over its Q-network instead of greedily.
+
+    Load trained weights into .model as for RLAgent. Each move runs `simulations`
+    simulations, or as many as fit in time_budget seconds, evaluating leaf_batch leaves
+    per forward pass.
+    """
+
+    def __init__(self, color, simulations=400, time_budget=None, leaf_batch=32, c_puct=1.5, temperature=0.25, **kwargs):
+        kwargs.setdefault("epsilon", 0.0)
+        super().__init__(color, **kwargs)
+        self.simulations = simulations
+        self.time_budget = time_budget
+        self.puct = PUCT(self.model, self.device, leaf_batch, c_puct, temperature)
+
+    def get_move(self, board_obj):
+        return self.puct.search(board_obj, self.color, self.simulations, self.time_budget)
@@ -0,0 +1,64 @@
+"""
+Experience replay for RLAgent: a ring buffer in preallocated NumPy arrays.
+
+A transition takes 39 bytes. The board before and after the move is stored as
+a pair of uint64 bitboards (own, opponent) from the storing agent's point of
+view. The move is an int16 square index (-1 for the final-reward records,
+which have none), the reward a float32 and done a bool. sample() draws
+indices in one call and decodes them straight into the [own, opponent] plane
+tensors the QNetwork takes (the encoding of utils.board_to_tensor).
+"""
+import numpy as np
+import torch
+
+from game.batch_board import bits_to_planes
+from game.board import array_to_bits
+
+NO_ACTION = -1
+
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer; once full, each push overwrites the oldest transition."""
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, 2), dtype=np.uint64)  # own, opponent bitboards
+        self.next_states = np.zeros((capacity, 2), dtype=np.uint64)
+        self.actions = np.full(capacity, NO_ACTION, dtype=np.int16)  # row * 8 + col
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.next_index = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.size
+
+    def push(self, state, action, reward, next_state, done, color):
+        """Store a transition of 8x8 board arrays, seen by the side playing `color`;
+        action is (row, col) or None."""
+        i = self.next_index
+        self.states[i] = array_to_bits(state == color), array_to_bits(state == -color)
+        self.next_states[i] = array_to_bits(next_state == color), array_to_bits(next_state == -color)
+        self.actions[i] = NO_ACTION if action is None else action[0] * 8 + action[1]
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.next_index = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size, device=None):
+        """batch_size transitions drawn uniformly (with replacement) as tensors: states and
+        next_states (B, 2, 8, 8) float32, actions (B,) int64, rewards (B,) float32, dones (B,) bool."""
+        idx = self.rng.integers(0, self.size, batch_size)
+        return (
+            _planes(self.states[idx], device),
+            torch.from_numpy(self.actions[idx].astype(np.int64)).to(device),
+            torch.from_numpy(self.rewards[idx]).to(device),
+            _planes(self.next_states[idx], device),
+            torch.from_numpy(self.dones[idx]).to(device),
+        )
+
+
+def _planes(boards, device):
+    planes = np.stack([bits_to_planes(boards[:, 0]), bits_to_planes(boards[:, 1])], axis=1)
+    return torch.from_numpy(planes.astype(np.float32)).to(device)
@@ -8,15 +8,16 @@ import torch
 import torch.nn.functional as F 
 import numpy as np
 import random
-import collections
 
 from game.player import Player
 from rl_agent.q_network import QNetwork
+from rl_agent.replay_buffer import ReplayBuffer
 from rl_agent.utils import board_to_tensor, action_to_index, index_to_action
 
 class RLAgent(Player):
-    def __init__(self, color, board_size=8, epsilon=0.1, lr=1e-4, device=None, target_update_freq=100, replay_buffer_size=10000, batch_size=32):
+    def __init__(self, color, board_size=8, epsilon=0.1, lr=1e-4, device=None, target_update_freq=100, replay_buffer_size=10000, batch_size=32, book=None):
         super().__init__(color)
+        self.book = book  # game.opening_book.OpeningBook; book moves are drawn by weight for variety
         self.board_size = board_size
         self.epsilon = epsilon
         self.device = device or torch.device("cpu")
@@ -25,11 +26,11 @@ class RLAgent(Player):
         self.target_model.load_state_dict(self.model.state_dict())
         self.target_model.eval()
         self.optimizer = torch.optim.Adam(self.model.parameters(), lr=lr)
-        self.transitions = []
-        self.replay_buffer = collections.deque(maxlen=replay_buffer_size)
+        self.replay_buffer = ReplayBuffer(replay_buffer_size)
         self.batch_size = batch_size
-        self.train_steps = 0
-        self.target_update_freq = target_update_freq
+        self.train_steps = 0  # optimizer steps, one per train_step batch
+        self.trained_samples = 0  # transitions those steps were computed on
+        self.target_update_freq = target_update_freq  # in trained transitions, not optimizer steps
 
     def _to_tensor(self, board_state):
         return board_to_tensor(board_state, self.color).unsqueeze(0).to(self.device)
@@ -38,48 +39,65 @@ class RLAgent(Player):
         valid_moves = board_obj.get_valid_moves(self.color)
         if not valid_moves:
             return None
+        if self.book is not None:
+            move = self.book.choose(board_obj, self.color, sample=True)
+            if move is not None:
+                return move
         if random.random() < self.epsilon:
             return random.choice(valid_moves)
         q_values = self.model(self._to_tensor(board_obj.state)).detach().cpu().numpy().flatten()
         return max(valid_moves, key=lambda m: q_values[action_to_index(m, self.board_size)])
 
+    def get_batch_moves(self, batch):
+        """Pick a move in every game of a game.batch_board.BatchBoard with one forward pass.
+
+        Returns row * 8 + col per game, or -1 where the agent has no valid move.
+        """
+        legal = batch.valid_moves(self.color)
+        planes = torch.from_numpy(batch.to_planes(self.color)).to(self.device)
+        with torch.no_grad():
+            q_values = self.model(planes).cpu().numpy()
+        greedy = np.where(legal, q_values, -np.inf).argmax(axis=1)
+        explore = np.where(legal, np.random.random(legal.shape), -1.0).argmax(axis=1)
+        moves = np.where(np.random.random(len(batch)) < self.epsilon, explore, greedy)
+        return np.where(legal.any(axis=1), moves, -1)
+
     def store_transition(self, state, action, reward, next_state, done):
         clipped_reward = float(np.clip(reward, -1, 1))
-        transition = (state, action, clipped_reward, next_state, done)
-        self.transitions.append(transition)
-        self.replay_buffer.append(transition)
+        self.replay_buffer.push(state, action, clipped_reward, next_state, done, self.color)
 
     def update_target_network(self):
         self.target_model.load_state_dict(self.model.state_dict())
 
     def train_step(self, gamma=0.99):
+        """One DQN update on a minibatch of batch_size transitions from the replay buffer.
+
+        Transitions without an action (the final reward records) are dropped from the
+        batch. Returns the batch loss, or None while the buffer is smaller than a batch.
+        The target network is synced every target_update_freq trained transitions (about
+        every 3 batches with the defaults), the cadence of the earlier per-sample updates.
+        """
         if len(self.replay_buffer) < self.batch_size:
-            self.transitions.clear()
             return None
-        batch = random.sample(self.replay_buffer, self.batch_size)
-        losses = [self._compute_loss(*sample, gamma) for sample in batch if sample[1] is not None]
-        self.transitions.clear()
-        if losses:
-            avg_loss = sum(losses) / len(losses)
-            return avg_loss
-        return None
+        states, actions, rewards, next_states, dones = self.replay_buffer.sample(self.batch_size, self.device)
+        keep = actions >= 0
+        if not keep.any():
+            return None
+        return self._compute_loss(states[keep], actions[keep], rewards[keep], next_states[keep], dones[keep], gamma)
 
-    def _compute_loss(self, state, action, reward, next_state, done, gamma):
-        state_tensor = self._to_tensor(state)
-        next_state_tensor = self._to_tensor(next_state)
-        q_vals = self.model(state_tensor)
-        target_q = reward
-        if not done:
-            with torch.no_grad():
-                target_q += gamma * torch.max(self.target_model(next_state_tensor)).item()
-        action_idx = action_to_index(action, self.board_size)
-        pred_q = q_vals[0, action_idx]
-        loss = F.smooth_l1_loss(pred_q, torch.tensor(target_q, dtype=torch.float32, device=self.device))
+    def _compute_loss(self, states, actions, rewards, next_states, dones, gamma):
+        # one forward pass for the batch, one for its targets, one backward pass and optimizer step
+        pred_q = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        with torch.no_grad():
+            target_q = rewards + gamma * (~dones) * self.target_model(next_states).max(dim=1).values
+        loss = F.smooth_l1_loss(pred_q, target_q)
         self.optimizer.zero_grad()
         loss.backward()
         torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=10.0)
         self.optimizer.step()
         self.train_steps += 1
-        if self.train_steps % self.target_update_freq == 0:
+        before = self.trained_samples
+        self.trained_samples += len(actions)
+        if self.trained_samples // self.target_update_freq > before // self.target_update_freq:
             self.update_target_network()
         return loss.item()
@@ -3,6 +3,9 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import numpy as np
 from game.board import Board
+from game.batch_board import BatchBoard
+from game.game_state import GameState
+from game.opening_book import load_book
 from rl_agent.rl_agent import RLAgent
 from game.player import MinimaxMax, RLRandomRiley, GreedyGreta
 import torch
@@ -48,6 +51,7 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Train RL agent for Othello with curriculum learning.")
     parser.add_argument('--resume', type=str, default=None, help='Path to run folder to resume training from')
     parser.add_argument('--episodes', type=int, default=500, help='Number of episodes to train (default: 500)')
+    parser.add_argument('--book', action='store_true', help='Open training games with moves drawn from the opening book')
     return parser.parse_args()
 
 args = parse_args()
@@ -108,7 +112,7 @@ MODEL_PATH = os.path.join(MODEL_DIR, MODEL_NAME)
 
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-agent = RLAgent(1, epsilon=0.1, device=device)  # Lower epsilon to 0.1
+agent = RLAgent(1, epsilon=0.1, device=device, book=load_book() if args.book else None)  # Lower epsilon to 0.1
 
 # --- wandb setup ---
 wandb_kwargs = {
@@ -152,14 +156,14 @@ def calculate_shaped_reward(prev_board, new_board, move, player):
 
 def play_game(agent_black, agent_red, train=True, log_rewards=None):
     board = Board()
+    game = GameState(board)  # legal moves of both sides computed once per ply
     state = np.copy(board.state)
     current_player = agent_black
     other_player = agent_red
     color = 1
     total_reward = 0
     while True:
-        valid_moves = board.get_valid_moves(color)
-        if valid_moves:
+        if game.has_valid_move(color):
             move = current_player.get_move(board)
             if move is not None:
                 prev_state = np.copy(board.state)
@@ -167,7 +171,7 @@ def play_game(agent_black, agent_red, train=True, log_rewards=None):
                 next_state = np.copy(board.state)
                 reward = calculate_shaped_reward(prev_state, next_state, move, color)
                 total_reward += reward
-                done = not (board.has_valid_move(1) or board.has_valid_move(-1))
+                done = game.is_terminal()
                 if train and isinstance(current_player, RLAgent):
                     current_player.store_transition(prev_state, move, reward, next_state, done)
         # Switch player
@@ -175,7 +179,7 @@ def play_game(agent_black, agent_red, train=True, log_rewards=None):
         current_player, other_player = other_player, current_player
 
         # Game over check
-        if not board.has_valid_move(1) and not board.has_valid_move(-1):
+        if game.is_terminal():
             black_count, red_count = board.count_pieces()
             # Final reward for win/loss/draw (skewed)
             if train and isinstance(agent_black, RLAgent):
@@ -199,10 +203,33 @@ def play_game(agent_black, agent_red, train=True, log_rewards=None):
                 log_rewards.append(total_reward)
             return black_count, red_count
 
+def play_games_batch(agent_black, agent_red, num_games):
+    # Plays num_games in lockstep on one BatchBoard. Players with get_batch_moves (RLAgent)
+    # answer for every game in one call, others are asked game by game.
+    batch = BatchBoard(num_games)
+    players = {1: agent_black, -1: agent_red}
+    while True:
+        over = batch.game_over()
+        if over.all():
+            return batch.count_pieces()
+        squares = np.full(num_games, -1)
+        for color, player in players.items():
+            to_move = (batch.side_to_move == color) & ~over
+            if not to_move.any():
+                continue
+            if hasattr(player, 'get_batch_moves'):
+                squares[to_move] = player.get_batch_moves(batch)[to_move]
+            else:
+                for i in np.flatnonzero(to_move):
+                    move = player.get_move(batch.board(i))
+                    if move is not None:
+                        squares[i] = move[0] * 8 + move[1]
+        batch.apply_moves(squares)
+
 def test_agent(agent, opponent, episodes=20):
     wins, losses, draws = 0, 0, 0
-    for ep in range(episodes):
-        black_score, red_score = play_game(agent, opponent, train=False)
+    black_scores, red_scores = play_games_batch(agent, opponent, episodes)
+    for black_score, red_score in zip(black_scores, red_scores):
         if black_score > red_score:
             wins += 1
         elif black_score < red_score:
@@ -219,7 +246,8 @@ def select_opponent(win_rate, phase):
     elif phase == 1:
         return RLRandomRiley(-1), 'RLRandomRiley'
     elif phase == 2:
-        return MinimaxMax(-1, depths=[2,2]), 'MinimaxMax'
+        # plain depth-2 lookahead: the endgame solver would make this phase a perfect (and slower) opponent
+        return MinimaxMax(-1, depths=[2,2], endgame_empties=0), 'MinimaxMax'
     else:
         # Self-play: agent vs. previous best
         prev_agent = RLAgent(-1, epsilon=0.0, device=device)
@@ -313,20 +341,14 @@ if __name__ == "__main__":
         black_score, red_score = play_game(agent, opponent, train=True, log_rewards=log_rewards)
         # --- Q-value and loss monitoring ---
         if hasattr(agent, 'replay_buffer') and len(agent.replay_buffer) >= agent.batch_size:
-            batch = random.sample(agent.replay_buffer, agent.batch_size)
-            for state, action, reward, next_state, done in batch:
-                if action is None:
-                    continue
-                state_tensor = agent._to_tensor(state)
-                next_state_tensor = agent._to_tensor(next_state)
-                q_vals = agent.model(state_tensor).detach().cpu().numpy().flatten()
-                q_values_list.append(q_vals.tolist())
-                target_q = reward
-                if not done:
-                    with torch.no_grad():
-                        next_q_vals = agent.target_model(next_state_tensor)
-                        target_q += agent.train_step.__defaults__[0] * torch.max(next_q_vals).item()  # gamma
-                target_q_values_list.append(target_q)
+            states, actions, rewards, next_states, dones = agent.replay_buffer.sample(agent.batch_size, agent.device)
+            keep = actions >= 0
+            gamma = agent.train_step.__defaults__[0]
+            with torch.no_grad():
+                q_vals = agent.model(states[keep])
+                target_q = rewards[keep] + gamma * (~dones[keep]) * agent.target_model(next_states[keep]).max(dim=1).values
+            q_values_list.extend(q_vals.cpu().numpy().tolist())
+            target_q_values_list.extend(target_q.cpu().numpy().tolist())
         loss = agent.train_step()  # Assume this returns the loss value
         if loss is not None:
             loss_values.append(loss)